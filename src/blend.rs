@@ -0,0 +1,89 @@
+//! # Additive Blending
+//!
+//! Masks and sparkles light a pixel by adding their color scaled by an
+//! intensity in `[0, 1]`, saturating at full brightness.
+//!
+//! The scale is done in fixed point: the intensity is converted once per pixel
+//! to a 24-bit fraction, and each channel is then an integer multiply and shift
+//! instead of a float multiply and float-to-int conversion. `255 * scale` still
+//! fits in a `u32`. Truncating the intensity to 24 bits loses less than
+//! `255 / 2^24` of a step, so a channel only comes out one lower than the float
+//! math when the product falls just short of a whole number; 8 fraction bits
+//! would visibly darken dim falloffs.
+
+/// Fraction bits of a fixed-point intensity
+const FRAC_BITS: u32 = 24;
+
+/// Add `color` scaled by `intensity` to `pixel`, saturating each channel at 255.
+///
+/// Intensities outside `[0, 1]` are clamped.
+#[inline]
+pub fn add_scaled(pixel: &mut [u8; 3], color: [u8; 3], intensity: f32) {
+    let scale = (intensity.clamp(0.0, 1.0) * (1u32 << FRAC_BITS) as f32) as u32;
+    for (channel, c) in pixel.iter_mut().zip(color) {
+        *channel = channel.saturating_add(((c as u32 * scale) >> FRAC_BITS) as u8);
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn scaled(color: [u8; 3], intensity: f32) -> [u8; 3] {
+        let mut pixel = [0, 0, 0];
+        add_scaled(&mut pixel, color, intensity);
+        pixel
+    }
+
+    #[test]
+    fn test_endpoints() {
+        assert_eq!(scaled([255, 128, 1], 0.0), [0, 0, 0]);
+        assert_eq!(scaled([255, 128, 1], 1.0), [255, 128, 1]);
+    }
+
+    #[test]
+    fn test_clamps_intensity() {
+        assert_eq!(scaled([255, 128, 1], -0.5), [0, 0, 0]);
+        assert_eq!(scaled([255, 128, 1], f32::NEG_INFINITY), [0, 0, 0]);
+        assert_eq!(scaled([255, 128, 1], 1.5), [255, 128, 1]);
+        assert_eq!(scaled([255, 128, 1], f32::INFINITY), [255, 128, 1]);
+    }
+
+    #[test]
+    fn test_saturates_bright_pixel() {
+        let mut pixel = [250, 10, 255];
+        add_scaled(&mut pixel, [100, 100, 100], 0.5);
+        assert_eq!(pixel, [255, 60, 255]);
+
+        let mut pixel = [200, 200, 200];
+        add_scaled(&mut pixel, [255, 255, 255], 1.0);
+        assert_eq!(pixel, [255, 255, 255]);
+    }
+
+    #[test]
+    fn test_matches_float_scaling() {
+        for c in 0..=255u8 {
+            // Multiples of 1/4096 convert to the fixed-point scale exactly, so the
+            // result is exactly the floor of the true product
+            for k in 0..=4096 {
+                let i = k as f32 / 4096.0;
+                let fixed = scaled([c, 0, 0], i)[0];
+                assert_eq!(fixed, (c as f64 * i as f64).floor() as u8, "c={} i={}", c, i);
+                assert_eq!(fixed, (c as f32 * i) as u8, "c={} i={}", c, i);
+            }
+
+            // Decimal fractions aren't exact in binary; truncating them to 24
+            // fraction bits can land one step below the true product. The float
+            // product is rounded, but never below a whole number it exceeds
+            for k in 0..=1000 {
+                let i = k as f32 / 1000.0;
+                let fixed = scaled([c, 0, 0], i)[0] as i32;
+                let exact = (c as f64 * i as f64).floor() as i32;
+                let float = (c as f32 * i) as u8 as i32;
+                assert!(exact - fixed == 0 || exact - fixed == 1, "c={} i={} exact={} fixed={}", c, i, exact, fixed);
+                assert!(float == exact || float == exact + 1, "c={} i={} float={} exact={}", c, i, float, exact);
+                assert!(float - fixed <= 1, "c={} i={} float={} fixed={}", c, i, float, fixed);
+            }
+        }
+    }
+}
@@ -309,13 +309,15 @@ impl Database {
             ))
         })?.collect::<Result<Vec<_>, _>>()?;
 
+        // Prepared once and re-run for each scene, rather than re-parsing the SQL per scene
+        let mut scene_masks_stmt = self.conn.prepare(
+            "SELECT mask_id, mask_type, x, y, params_json FROM scene_masks WHERE scene_id = ?1 ORDER BY display_order"
+        )?;
+
         let mut scenes = Vec::new();
         for (id, name, kind, category, global_json, global_effects_json, launchpad_btn, launchpad_is_cc, launchpad_color) in scene_rows {
             // Load scene masks
-            let mut stmt = self.conn.prepare(
-                "SELECT mask_id, mask_type, x, y, params_json FROM scene_masks WHERE scene_id = ?1 ORDER BY display_order"
-            )?;
-            let scene_masks = stmt.query_map([id as i64], |row| {
+            let scene_masks = scene_masks_stmt.query_map([id as i64], |row| {
                 let params_json: String = row.get(4)?;
                 let params: HashMap<String, serde_json::Value> = serde_json::from_str(&params_json)
                     .map_err(|e| rusqlite::Error::ToSqlConversionFailure(Box::new(e)))?;
@@ -431,11 +433,28 @@ impl Database {
         tx.execute("DELETE FROM masks", [])?;
         tx.execute("DELETE FROM strips", [])?;
 
+        // Each insert is prepared once and re-executed per row, rather than
+        // re-parsing the SQL for every strip, mask and scene
+        let mut insert_strip = tx.prepare(
+            "INSERT INTO strips (id, universe, start_channel, pixel_count, x, y, spacing, flipped, color_order)
+             VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9)",
+        )?;
+        let mut insert_mask = tx.prepare(
+            "INSERT INTO masks (id, mask_type, x, y, params_json)
+             VALUES (?1, ?2, ?3, ?4, ?5)",
+        )?;
+        let mut insert_scene = tx.prepare(
+            "INSERT INTO scenes (id, name, kind, category, global_effect_json, global_effects_json, launchpad_btn, launchpad_is_cc, launchpad_color)
+             VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9)",
+        )?;
+        let mut insert_scene_mask = tx.prepare(
+            "INSERT INTO scene_masks (scene_id, mask_id, mask_type, x, y, params_json, display_order)
+             VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7)",
+        )?;
+
         // Save strips
         for strip in &state.strips {
-            tx.execute(
-                "INSERT INTO strips (id, universe, start_channel, pixel_count, x, y, spacing, flipped, color_order)
-                 VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9)",
+            insert_strip.execute(
                 params![
                     strip.id as i64,
                     strip.universe,
@@ -453,9 +472,7 @@ impl Database {
         // Save global masks
         for mask in &state.masks {
             let params_json = serde_json::to_string(&mask.params)?;
-            tx.execute(
-                "INSERT INTO masks (id, mask_type, x, y, params_json)
-                 VALUES (?1, ?2, ?3, ?4, ?5)",
+            insert_mask.execute(
                 params![mask.id as i64, mask.mask_type, mask.x, mask.y, params_json],
             )?;
         }
@@ -467,9 +484,7 @@ impl Database {
                 .transpose()?;
             let global_effects_json = serde_json::to_string(&scene.global_effects)?;
 
-            tx.execute(
-                "INSERT INTO scenes (id, name, kind, category, global_effect_json, global_effects_json, launchpad_btn, launchpad_is_cc, launchpad_color)
-                 VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9)",
+            insert_scene.execute(
                 params![
                     scene.id as i64,
                     scene.name,
@@ -486,9 +501,7 @@ impl Database {
             // Save scene masks
             for (idx, mask) in scene.masks.iter().enumerate() {
                 let params_json = serde_json::to_string(&mask.params)?;
-                tx.execute(
-                    "INSERT INTO scene_masks (scene_id, mask_id, mask_type, x, y, params_json, display_order)
-                     VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7)",
+                insert_scene_mask.execute(
                     params![
                         scene.id as i64,
                         mask.id as i64,
@@ -502,6 +515,9 @@ impl Database {
             }
         }
 
+        // Statements borrow the transaction, so release them before committing
+        drop((insert_strip, insert_mask, insert_scene, insert_scene_mask));
+
         // Save app config
         tx.execute(
             "UPDATE app_config SET
@@ -1,5 +1,9 @@
-use crate::model::{AppState, Mask, PixelStrip, NetworkConfig, GlobalEffect};
+use crate::model::{AppState, Mask, PixelStrip, NetworkConfig, GlobalEffect, exact_rgb};
 use crate::audio::AudioListener;
+use crate::scanner::ScannerMask;
+use crate::blend::add_scaled;
+use crate::geometry::{LayoutCache, StripGeometry, span_overlaps_disc};
+use crate::transmit::{DmxFrame, SacnOutput, UNIVERSE_LEN};
 use sacn::source::SacnSource;
 use std::time::Instant;
 use log::{info, debug, warn, error};
@@ -27,9 +31,9 @@ struct GlitchPixel {
 }
 
 pub struct LightingEngine {
-    sender: SacnSource,
+    // sACN sender, running on its own thread
+    output: SacnOutput,
     link: AblLink,
-    registered_universes: std::collections::HashSet<u16>,
     bind_ip: Option<String>,
     pub speed: f32,
     pub latency_ms: f32,
@@ -41,6 +45,8 @@ pub struct LightingEngine {
     pub current_beat: u8, // 1, 2, 3, 4
     start_time: Instant,
     last_network: NetworkConfig,
+    // sACN destination resolved from `last_network` (see `resolve_destination`)
+    network_dst: Option<Option<std::net::SocketAddr>>,
     flywheel_beat: f64,
     last_update: std::time::Instant,
     sync_error_timer: f32, // How long we've been out of sync
@@ -65,6 +71,15 @@ pub struct LightingEngine {
     glitch_sparkle_accumulator: f32,
     // Burst effect radius smoothing per-mask
     burst_radius_states: std::collections::HashMap<u64, f32>,
+    // Link session tempo and peer count as of the last update
+    link_tempo: f64,
+    link_peers: u64,
+    // Cached world-space pixel positions, refreshed once per frame
+    layout: LayoutCache,
+    // (strip index, mask kernel index) pairs for the current frame, reused across frames
+    mask_hits: Vec<(usize, usize)>,
+    // Strip ID -> index into the strip list, rebuilt by `index_strips`
+    strip_index: std::collections::HashMap<u64, usize>,
 }
 
 impl LightingEngine {
@@ -91,9 +106,8 @@ impl LightingEngine {
         info!("[LIGHTS] Ableton Link enabled at 120 BPM");
         
         Self {
-            sender,
+            output: SacnOutput::spawn(sender),
             link,
-            registered_universes: std::collections::HashSet::new(),
             bind_ip: None,
             speed: 1.0,
             latency_ms: 0.0,
@@ -105,6 +119,7 @@ impl LightingEngine {
             current_beat: 1,
             start_time: Instant::now(),
             last_network: NetworkConfig::default(),
+            network_dst: resolve_destination(&NetworkConfig::default()),
             flywheel_beat: 0.0,
             last_update: Instant::now(),
             sync_error_timer: 0.0,
@@ -120,6 +135,11 @@ impl LightingEngine {
             glitch_states: Vec::new(),
             glitch_sparkle_accumulator: 0.0,
             burst_radius_states: std::collections::HashMap::new(),
+            link_tempo: 120.0,
+            link_peers: 0,
+            layout: LayoutCache::new(),
+            mask_hits: Vec::new(),
+            strip_index: std::collections::HashMap::new(),
         }
     }
 
@@ -155,6 +175,9 @@ impl LightingEngine {
         
         let tempo = session_state.tempo();
         let link_peers = self.link.num_peers();
+        // Kept for the status readouts, so they don't capture the session again
+        self.link_tempo = tempo;
+        self.link_peers = link_peers;
 
         // Hybrid Sync / Audio logic
         let mut force_snap = false;
@@ -236,7 +259,7 @@ impl LightingEngine {
                     // 2. Phase correction for hybrid sync
                     if self.hybrid_sync {
                         // Get current effective BPM
-                        let current_bpm = if self.link.num_peers() > 0 {
+                        let current_bpm = if link_peers > 0 {
                             tempo
                         } else if self.audio_bpm > 30.0 {
                             self.audio_bpm
@@ -366,139 +389,120 @@ impl LightingEngine {
             0.0
         };
 
-        // 1. Clear all strips
-        for strip in &mut state.strips {
-            strip.data = vec![[0, 0, 0]; strip.pixel_count];
-        }
+        // Resolve pixel world positions once; every mask below reads from this cache
+        self.layout.refresh(&state.strips);
 
-        // 2. Apply Scene or fallback to raw masks
+        // 1. Apply Scene or fallback to raw masks
         if let Some(sel_id) = state.selected_scene_id {
-            if let Some(scene) = state.scenes.iter().find(|s| s.id == sel_id).cloned() {
+            // Borrowed in place: the scene is only read, and cloning it would copy every
+            // mask's parameter map each frame
+            if let Some(scene) = state.scenes.iter().find(|s| s.id == sel_id) {
                 match scene.kind.as_str() {
                     "Masks" => {
-                        for mask in &scene.masks {
-                            self.apply_mask_to_strips(mask, &mut state.strips, t, beat);
-                        }
+                        self.render_masks(&scene.masks, &mut state.strips, t, beat);
                     }
                     "Global" => {
+                        clear_strips(&mut state.strips);
                         for config in &scene.global_effects {
                              self.apply_global_effect(&config.effect, &mut state.strips, t, beat, config.targets.as_ref());
                         }
                     }
                     _ => {
-                        for mask in &state.masks {
-                            self.apply_mask_to_strips(mask, &mut state.strips, t, beat);
-                        }
+                        self.render_masks(&state.masks, &mut state.strips, t, beat);
                     }
                 }
             } else {
                 // Selected scene not found, fallback
-                for mask in &state.masks {
-                    self.apply_mask_to_strips(mask, &mut state.strips, t, beat);
-                }
+                self.render_masks(&state.masks, &mut state.strips, t, beat);
             }
         } else {
             // No scene selected: use masks directly
-            for mask in &state.masks {
-                self.apply_mask_to_strips(mask, &mut state.strips, t, beat);
-            }
+            self.render_masks(&state.masks, &mut state.strips, t, beat);
+        }
+
+        // 2. Send to sACN
+        // The destination only changes with the network settings, so the IP is
+        // parsed again only when they do
+        if state.network != self.last_network {
+            self.last_network.clone_from(&state.network);
+            self.network_dst = resolve_destination(&state.network);
         }
+        let Some(dst_ip) = self.network_dst else {
+            // Invalid Unicast IP, skip
+            return;
+        };
+
+        // Render into a frame buffer the output thread has finished with
+        let mut frame = self.output.take_frame();
+        frame.dst_ip = dst_ip;
 
-        // 3. Send to sACN
         // Coalesce data by universe
-        let mut universe_data: std::collections::HashMap<u16, Vec<u8>> = std::collections::HashMap::new();
-        
         let global_universe_offset = state.network.universe.saturating_sub(1);
+        // specific strip universe + global offset (clamped to valid sACN range 1-63999)
+        let universe_of = |strip: &PixelStrip| strip.universe.saturating_add(global_universe_offset).min(63999).max(1);
+
+        // Universes mapped this frame, sorted and deduplicated
+        frame.universes.clear();
+        frame.universes.extend(state.strips.iter().map(universe_of));
+        frame.universes.sort_unstable();
+        frame.universes.dedup();
+
+        // One contiguous buffer holds every universe's packet in `universes` order.
+        // Clearing and resizing zeroes it in place (start codes included) and only
+        // allocates when the universe count grows.
+        let DmxFrame { universes, data, .. } = &mut frame;
+        data.clear();
+        data.resize(universes.len() * UNIVERSE_LEN, 0);
 
         for strip in &state.strips {
-             // specific strip universe + global offset (clamped to valid sACN range 1-63999)
-             let u = strip.universe.saturating_add(global_universe_offset).min(63999).max(1);
+             let u = universe_of(strip);
 
              // sACN allows multiple strips in one universe if channels don't overlap
              let start = (strip.start_channel as usize).saturating_sub(1);
              
-             // Ensure we have a buffer (512 bytes for DMX)
-             let entry = universe_data.entry(u).or_insert_with(|| vec![0; 512]);
+             // Locate the universe's slot, skipping its start code
+             let slot = universes.binary_search(&u).expect("universe collected above");
+             let entry = &mut data[slot * UNIVERSE_LEN + 1..(slot + 1) * UNIVERSE_LEN];
              
-             for (i, pixel) in strip.data.iter().enumerate() {
-                 let idx = start + i * 3;
-                 // Bounds check: ensure idx, idx+1, idx+2 are all valid
-                 if let Some(max_idx) = idx.checked_add(2) {
-                     if max_idx < entry.len() {
-                         match strip.color_order.as_str() {
-                             "GRB" => {
-                                 entry[idx] = pixel[1];   // G
-                                 entry[idx+1] = pixel[0]; // R
-                                 entry[idx+2] = pixel[2]; // B
-                             },
-                             "BGR" => {
-                                 entry[idx] = pixel[2];   // B
-                                 entry[idx+1] = pixel[1]; // G
-                                 entry[idx+2] = pixel[0]; // R
-                             },
-                             _ => { // RGB
-                                 entry[idx] = pixel[0];   // R
-                                 entry[idx+1] = pixel[1]; // G
-                                 entry[idx+2] = pixel[2]; // B
-                             }
-                         }
-                     }
+             // Resolve the color order once per strip rather than per pixel
+             let order = channel_order(&strip.color_order);
+
+             // Only pixels whose three channels fit inside the universe are patched;
+             // chunks_exact_mut stops at the last whole pixel slot.
+             let dst = &mut entry[start.min(512)..];
+             if order == [0, 1, 2] {
+                 // Pixels are already stored in wire order: one copy for the whole strip
+                 let n = strip.data.len().min(dst.len() / 3);
+                 dst[..n * 3].copy_from_slice(strip.data[..n].as_flattened());
+             } else {
+                 for (out, pixel) in dst.chunks_exact_mut(3).zip(&strip.data) {
+                     out[0] = pixel[order[0]];
+                     out[1] = pixel[order[1]];
+                     out[2] = pixel[order[2]];
                  }
              }
         }
-    
-        
-        // Debug: Log color data before sending
-        static mut LAST_COLOR_LOG: f32 = 0.0;
-
-        for (u, data) in universe_data {
-            if !self.registered_universes.contains(&u) {
-                match self.sender.register_universe(u) {
-                    Ok(_) => {
-                        self.registered_universes.insert(u);
-                        info!("[LIGHTS] Registered sACN Universe {}", u);
-                    },
-                    Err(e) => {
-                        error!("[LIGHTS] Failed to register sACN Universe {}: {:?}", u, e);
-                    }
-                }
-            }
-
-            let priority = 100; // Default priority
-            let dst_ip: Option<std::net::SocketAddr> = if state.network.use_multicast {
-                None
-            } else {
-                if let Ok(ip) = state.network.unicast_ip.parse::<std::net::IpAddr>() {
-                    Some(std::net::SocketAddr::new(ip, 5568))
-                } else {
-                    None // Fallback
-                }
-            };
 
-            // Only send if we have a valid config (if Unicast was selected but invalid IP, we might SKIP or fall back)
-            // User code implies we should try to send.
-            // If !multicast and invalid IP -> dst_ip is None -> Sends Multicast?
-            // Let's explicitly check:
-            if !state.network.use_multicast && dst_ip.is_none() {
-                // Invalid Unicast IP, skip or log
-                continue;
-            }
-            // let _ = self.sender.send(&[u], &data, Some(priority), dst_ip, None);
-            let mut fixed_data = vec![0u8]; // Start Code
-            fixed_data.extend_from_slice(&data);
+        // Sending happens on the output thread
+        self.output.submit(frame);
+    }
 
-            match self.sender.send(&[u], &fixed_data, Some(200), dst_ip, None) {
-                Ok(_) => {
-                    // Success - use trace level to avoid flooding logs
-                }
-                Err(e) => {
-                    warn!("[LIGHTS] sACN send error on Universe {} (Dest: {:?}): {:?}", u, dst_ip, e);
-                }
-            }
-        }
+    /// Clear every strip and composite `masks` onto it in a single pass.
+    ///
+    /// Each strip is cleared and then has every mask that reaches it applied
+    /// while its pixels are still in cache, rather than clearing all strips and
+    /// then sweeping the whole layout once per mask.
+    fn render_masks(&mut self, masks: &[Mask], strips: &mut [PixelStrip], t: f32, beat: f64) {
+        let kernels: Vec<MaskKernel> = masks.iter()
+            .filter_map(|mask| self.prepare_mask(mask, t, beat))
+            .collect();
+
+        composite_masks(&kernels, strips, &self.layout, &mut self.mask_hits);
     }
 
-    fn apply_mask_to_strips(&mut self, mask: &Mask, strips: &mut [PixelStrip], t: f32, beat: f64) {
+    /// Resolve a mask's parameters for this frame into a kernel that can be run
+    /// on each strip. Returns `None` when the mask draws nothing this frame.
+    fn prepare_mask(&mut self, mask: &Mask, t: f32, beat: f64) -> Option<MaskKernel> {
         let mx = mask.x;
         let my = mask.y;
         
@@ -512,11 +516,11 @@ impl LightingEngine {
                 hsv_to_rgb(hue, 1.0, 1.0)
             } else if mode == "gradient" {
                 let colors: Vec<[u8; 3]> = mask.params.get("gradient_colors").and_then(|v| {
-                    serde_json::from_value(v.clone()).ok()
+                    v.as_array()?.iter().map(exact_rgb).collect()
                 }).unwrap_or_else(|| {
                     // Fallback
-                    let c1 = mask.params.get("color").and_then(|v| serde_json::from_value(v.clone()).ok()).unwrap_or([0, 255, 255]);
-                    let c2 = mask.params.get("color2").and_then(|v| serde_json::from_value(v.clone()).ok()).unwrap_or([255, 0, 255]);
+                    let c1 = mask.params.get("color").and_then(exact_rgb).unwrap_or([0, 255, 255]);
+                    let c2 = mask.params.get("color2").and_then(exact_rgb).unwrap_or([255, 0, 255]);
                     vec![c1, c2]
                 });
                 
@@ -530,7 +534,7 @@ impl LightingEngine {
                 // Re-calculating here for simplicity as we don't have 'phase' variable yet.
                 // WAIT: 'phase' is calculated inside scanner block. But 'get_color' helper is defined before it.
                 // Let's defer color calculation until after phase is known? 
-                // BUT 'apply_mask_to_strips' structure defines 'get_color' then uses it.
+                // BUT 'prepare_mask' structure defines 'get_color' then uses it.
                 // Let's use 't' and 'beat' here to calc independent color phase if needed, 
                 // OR ideally, move 'phase' calc up.
                 
@@ -582,11 +586,6 @@ impl LightingEngine {
 
             // Get mask rotation
             let rotation_deg = mask.params.get("rotation").and_then(|v| v.as_f64()).unwrap_or(0.0) as f32;
-            let rot_rad = rotation_deg.to_radians();
-            let cos_rot = rot_rad.cos();
-            let sin_rot = rot_rad.sin();
-
-
 
             // Get bar parameters
             let base_bar_width = mask.params.get("bar_width").and_then(|v| v.as_f64()).unwrap_or(0.1) as f32;
@@ -627,111 +626,19 @@ impl LightingEngine {
                 phase.sin()
             };
 
-            // Bar position in local space
-            // Sweep the BAR CENTER within ±(width/2 - bar_width) so that
-            // the bar's EDGES can exactly reach the mask edges without relying
-            // on osc_val hitting perfect ±1.0. This prevents a dark sliver at
-            // the mask boundaries, especially noticeable when rotated.
-            let sweep_range = (width / 2.0) - bar_width;
-            let bar_local_x = sweep_range * osc_val as f32;
-
-            // Debug bar position - DETAILED
-            static mut LAST_LOG_TIME: f32 = 0.0;
-            let should_log_detailed = unsafe {
-                if t - LAST_LOG_TIME > 0.5 { // Log every 0.5 seconds
-                    LAST_LOG_TIME = t;
-                    true
-                } else {
-                    false
-                }
-            };
-
-            
+            // Bar position: osc_val sweeps the BAR CENTER within ±(width/2 - bar_width)
+            // (see ScannerMask::new) so the bar's EDGES reach the mask edges without
+            // relying on osc_val hitting perfect ±1.0.
 
             // Get color
-            let m_color = mask.params.get("color").and_then(|v| {
-                let arr = v.as_array()?;
-                Some([arr.get(0)?.as_u64()? as u8, arr.get(1)?.as_u64()? as u8, arr.get(2)?.as_u64()? as u8])
-            }).unwrap_or([0, 255, 255]);
+            let m_color = color_param(&mask.params, "color").unwrap_or([0, 255, 255]);
             let final_color = get_color(m_color);
 
-            // Process each strip
-            for i in 0..strips.len() {
-                let strip = &mut strips[i];
-                let pixel_limit = strip.pixel_count.min(strip.data.len());
-
-                for p in 0..pixel_limit {
-                    // 1. Calculate pixel position in world space
-                    let local_pos_x = if strip.flipped {
-                        ((strip.pixel_count - 1).saturating_sub(p)) as f32 * strip.spacing
-                    } else {
-                        p as f32 * strip.spacing
-                    };
-                    let px = strip.x + local_pos_x;
-                    let py = strip.y;
-
-                    // 2. Transform to mask's local coordinate system
-                    let dx = px - mx;
-                    let dy = py - my;
-                    let mask_local_x = dx * cos_rot + dy * sin_rot;
-                    let mask_local_y = -dx * sin_rot + dy * cos_rot;
-
-                    // 3. Check if pixel is within mask bounds (rectangular boundary)
-                    let half_w = width / 2.0;
-                    let half_h = height / 2.0;
-
-                    // Add small epsilon for floating point tolerance
-                    const EPSILON: f32 = 0.0001;
-
-                    // Debug: Log pixels that SHOULD light up at extremes
-                    if should_log_detailed && i == 0 {
-                        let passes_bounds = (mask_local_x >= -(half_w + EPSILON) && mask_local_x <= (half_w + EPSILON)) &&
-                                    (mask_local_y >= -(half_h + EPSILON) && mask_local_y <= (half_h + EPSILON));
-                        let dist_to_bar = (mask_local_x - bar_local_x).abs();
-                        let in_bar = dist_to_bar <= bar_width;
-
-                        // Log pixels near mask edges
-                        let near_left_edge = mask_local_x < -half_w + 0.3;
-                        let near_right_edge = mask_local_x > half_w - 0.3;
-
-                    }
-
-                    if (mask_local_x >= -(half_w + EPSILON) && mask_local_x <= (half_w + EPSILON)) &&
-                       (mask_local_y >= -(half_h + EPSILON) && mask_local_y <= (half_h + EPSILON)) {
-
-                        if debug_fill {
-                            // Visualization: show everything the mask considers "inside"
-                            strip.data[p] = [255, 255, 255];
-                            continue;
-                        }
-
-                        // 4. Check if pixel is hit by the scanning bar
-                        let dist_to_bar = (mask_local_x - bar_local_x).abs();
-
-                        if dist_to_bar <= bar_width {
-                            // Pixel is inside mask AND hit by bar
-                            let intensity = if hard_edge {
-                                1.0
-                            } else {
-                                (1.0 - dist_to_bar / bar_width).max(0.0)
-                            };
-
-                            if intensity > 0.0 {
-                                let r = (final_color[0] as f32 * intensity) as u8;
-                                let g = (final_color[1] as f32 * intensity) as u8;
-                                let b = (final_color[2] as f32 * intensity) as u8;
-
-                                let curr = strip.data[p];
-                                strip.data[p] = [
-                                    curr[0].saturating_add(r),
-                                    curr[1].saturating_add(g),
-                                    curr[2].saturating_add(b)
-                                ];
-                            }
-                        }
-                    }
-                }
-            }
+            let kernel = ScannerMask::new(
+                mx, my, width, height, rotation_deg,
+                osc_val as f32, bar_width, hard_edge, final_color,
+            );
+            Some(MaskKernel::Scanner { kernel, debug_fill })
         } else if mask.mask_type == "orbit" {
             // Orbit Mask: A bar that traces around the perimeter of a rectangle
             // Goes: top (left→right) → right (top→bottom) → bottom (right→left) → left (bottom→top)
@@ -816,118 +723,28 @@ impl LightingEngine {
             };
 
             // Only render if bar is visible (side_progress >= 0, otherwise waiting for next beat)
-            if side_progress >= 0.0 {
-                // Get color
-                let m_color = mask.params.get("color").and_then(|v| {
-                    let arr = v.as_array()?;
-                    Some([arr.get(0)?.as_u64()? as u8, arr.get(1)?.as_u64()? as u8, arr.get(2)?.as_u64()? as u8])
-                }).unwrap_or([0, 255, 255]);
-                let final_color = get_color(m_color);
-
-                // Process each strip
-                for strip in strips.iter_mut() {
-                    let pixel_limit = strip.pixel_count.min(strip.data.len());
+            if side_progress < 0.0 {
+                return None;
+            }
 
-                    for p in 0..pixel_limit {
-                        // Calculate pixel position in world space
-                        let local_pos_x = if strip.flipped {
-                            ((strip.pixel_count - 1).saturating_sub(p)) as f32 * strip.spacing
-                        } else {
-                            p as f32 * strip.spacing
-                        };
-                        let px = strip.x + local_pos_x;
-                        let py = strip.y;
-
-                        // Transform to mask's local coordinate system (no rotation for orbit)
-                        let mask_local_x = px - mx;
-                        let mask_local_y = py - my;
-
-                        // Check if pixel is within mask bounds
-                        const EPSILON: f32 = 0.0001;
-                        if (mask_local_x >= -(half_w + EPSILON) && mask_local_x <= (half_w + EPSILON)) &&
-                           (mask_local_y >= -(half_h + EPSILON) && mask_local_y <= (half_h + EPSILON)) {
-
-                            // Calculate distance to bar based on bar orientation
-                            let dist_to_bar = if is_horizontal {
-                                // Bar is horizontal (on left/right edges) - check Y distance
-                                (mask_local_y - bar_center_y).abs()
-                            } else {
-                                // Bar is vertical (on top/bottom edges) - check X distance
-                                (mask_local_x - bar_center_x).abs()
-                            };
-
-                            if dist_to_bar <= bar_width {
-                                let intensity = if hard_edge {
-                                    1.0
-                                } else {
-                                    (1.0 - dist_to_bar / bar_width).max(0.0)
-                                };
+            // Get color
+            let m_color = color_param(&mask.params, "color").unwrap_or([0, 255, 255]);
+            let final_color = get_color(m_color);
 
-                                if intensity > 0.0 {
-                                    let r = (final_color[0] as f32 * intensity) as u8;
-                                    let g = (final_color[1] as f32 * intensity) as u8;
-                                    let b = (final_color[2] as f32 * intensity) as u8;
-
-                                    let curr = strip.data[p];
-                                    strip.data[p] = [
-                                        curr[0].saturating_add(r),
-                                        curr[1].saturating_add(g),
-                                        curr[2].saturating_add(b)
-                                    ];
-                                }
-                            }
-                        }
-                    }
-                }
-            }
+            Some(MaskKernel::Orbit(OrbitKernel::new(
+                mx, my, width, height,
+                bar_center_x, bar_center_y, is_horizontal,
+                bar_width, hard_edge, final_color,
+            )))
         } else if mask.mask_type == "radial" {
              let base_radius = mask.params.get("radius").and_then(|v| v.as_f64()).unwrap_or(0.2) as f32;
              let radius = apply_lfo_modulation(base_radius, &mask.params, "radius", t, beat);
              let debug_fill = mask.params.get("debug_fill").and_then(|v| v.as_bool()).unwrap_or(false);
-             let m_color = mask.params.get("color").and_then(|v| {
-                let arr = v.as_array()?;
-                Some([
-                    arr.get(0)?.as_u64()? as u8,
-                    arr.get(1)?.as_u64()? as u8,
-                    arr.get(2)?.as_u64()? as u8
-                ])
-            }).unwrap_or([255, 0, 0]);
+             let m_color = color_param(&mask.params, "color").unwrap_or([255, 0, 0]);
             
             let final_color = get_color(m_color);
 
-             for strip in strips.iter_mut() {
-                // ALIGNMENT FIX: Start at 0
-                let start_idx_x = 0.0;
-
-                let pixel_limit = strip.pixel_count.min(strip.data.len());
-                for i in 0..pixel_limit {
-                    let local_x = start_idx_x + (i as f32 * strip.spacing);
-                    let local_y = 0.0;
-                    
-                    let (px, py) = if strip.flipped {
-                         (strip.x - local_x, strip.y)
-                    } else {
-                         (strip.x + local_x, strip.y)
-                    };
-
-                    let dist = ((px - mx).powi(2) + (py - my).powi(2)).sqrt();
-                    if dist < radius {
-                         if debug_fill {
-                             strip.data[i] = [255, 255, 255];
-                             continue;
-                         }
-                         let intensity = 1.0 - (dist / radius);
-                         let intensity = intensity.clamp(0.0, 1.0);
-
-                         let [r, g, b] = strip.data[i];
-                         strip.data[i] = [
-                              r.saturating_add((final_color[0] as f32 * intensity) as u8),
-                              g.saturating_add((final_color[1] as f32 * intensity) as u8),
-                              b.saturating_add((final_color[2] as f32 * intensity) as u8),
-                         ];
-                    }
-                 }
-              }
+            Some(MaskKernel::Radial(RadialKernel::new(mx, my, radius, final_color, debug_fill)))
         } else if mask.mask_type == "burst" {
             // Burst Mask: Audio-reactive radial mask that grows/shrinks with music
             let base_radius = mask.params.get("base_radius").and_then(|v| v.as_f64()).unwrap_or(0.1) as f32;
@@ -935,10 +752,7 @@ impl LightingEngine {
             let sensitivity = mask.params.get("sensitivity").and_then(|v| v.as_f64()).unwrap_or(0.5) as f32;
             let decay = mask.params.get("decay").and_then(|v| v.as_f64()).unwrap_or(0.05) as f32;
 
-            let color = mask.params.get("color").and_then(|v| {
-                let arr = v.as_array()?;
-                Some([arr.get(0)?.as_u64()? as u8, arr.get(1)?.as_u64()? as u8, arr.get(2)?.as_u64()? as u8])
-            }).unwrap_or([255, 100, 0]);
+            let color = color_param(&mask.params, "color").unwrap_or([255, 100, 0]);
 
             // Get audio volume
             let audio_vol = if let Some(audio) = &self.audio_listener {
@@ -954,45 +768,17 @@ impl LightingEngine {
             // Smooth to target
             let current_radius = self.burst_radius_states.entry(mask.id).or_insert(base_radius);
             *current_radius = *current_radius + (target_radius - *current_radius) * decay;
+            let radius = *current_radius;
 
-            let mx = mask.x;
-            let my = mask.y;
-
-            // Render like radial mask
-            for strip in strips.iter_mut() {
-                let pixel_count = strip.pixel_count.min(strip.data.len());
-                for i in 0..pixel_count {
-                    let local_x = if strip.flipped {
-                         ((strip.pixel_count - 1).saturating_sub(i)) as f32 * strip.spacing
-                    } else {
-                         i as f32 * strip.spacing
-                    };
-                    let px = strip.x + local_x;
-                    let py = strip.y;
-
-                    let dist = ((px - mx).powi(2) + (py - my).powi(2)).sqrt();
-                    if dist < *current_radius {
-                        let intensity = (1.0 - dist / *current_radius).clamp(0.0, 1.0);
-
-                        let r = (color[0] as f32 * intensity) as u8;
-                        let g = (color[1] as f32 * intensity) as u8;
-                        let b = (color[2] as f32 * intensity) as u8;
-
-                        strip.data[i] = [
-                            strip.data[i][0].saturating_add(r),
-                            strip.data[i][1].saturating_add(g),
-                            strip.data[i][2].saturating_add(b),
-                        ];
-                    }
-                }
-            }
+            Some(MaskKernel::Burst(RadialKernel::new(mask.x, mask.y, radius, color, false)))
+        } else {
+            None
         }
     }
 
+    /// Link session tempo as of the last update.
     pub fn get_bpm(&self) -> f64 {
-        let mut session_state = SessionState::new();
-        self.link.capture_app_session_state(&mut session_state);
-        session_state.tempo()
+        self.link_tempo
     }
 
     pub fn get_beat(&self) -> f64 {
@@ -1004,12 +790,11 @@ impl LightingEngine {
         self.start_time.elapsed().as_secs_f32()
     }
     
+    /// Active tempo source and BPM, from the state captured by the last update.
     pub fn get_sync_info(&self) -> (String, f64) {
-        let peers = self.link.num_peers();
+        let peers = self.link_peers;
         if peers > 0 {
-             let mut session_state = SessionState::new();
-             self.link.capture_app_session_state(&mut session_state);
-             (format!("LINK ({} Peers)", peers), session_state.tempo())
+             (format!("LINK ({} Peers)", peers), self.link_tempo)
         } else if self.audio_bpm > 30.0 {
              ("AUDIO".to_string(), self.audio_bpm)
         } else {
@@ -1019,28 +804,37 @@ impl LightingEngine {
 }
 
 impl LightingEngine {
+    /// Rebuild the strip ID lookup for `strips`.
+    ///
+    /// Lets every live sparkle find its strip in constant time instead of
+    /// scanning the whole list. If IDs repeat, the first strip wins, as with a
+    /// linear search.
+    fn index_strips(&mut self, strips: &[PixelStrip]) {
+        self.strip_index.clear();
+        for (i, strip) in strips.iter().enumerate() {
+            self.strip_index.entry(strip.id).or_insert(i);
+        }
+    }
+
     fn apply_global_effect(&mut self, effect: &GlobalEffect, strips: &mut [PixelStrip], t: f32, beat: f64, targets: Option<&Vec<u64>>) {
         match effect.kind.as_str() {
             "Solid" => {
                 // Use EXACT same color reading as masks
-                let color = effect.params.get("color").and_then(|v| {
-                    let arr = v.as_array()?;
-                    Some([arr.get(0)?.as_u64()? as u8, arr.get(1)?.as_u64()? as u8, arr.get(2)?.as_u64()? as u8])
-                }).unwrap_or([255, 255, 255]);
+                let color = color_param(&effect.params, "color").unwrap_or([255, 255, 255]);
 
                 // Apply color EXACTLY like scanner masks do - with intensity and saturating_add
+                // The scaled color is the same for every pixel, so compute it once
+                let intensity = 1.0; // Full intensity for solid colors
+                let r = (color[0] as f32 * intensity) as u8;
+                let g = (color[1] as f32 * intensity) as u8;
+                let b = (color[2] as f32 * intensity) as u8;
+
                 for s in strips.iter_mut() {
                     if let Some(t) = targets { if !t.contains(&s.id) { continue; } }
                     
                     let cnt = s.pixel_count.min(s.data.len());
-                    for i in 0..cnt {
-                        let intensity = 1.0; // Full intensity for solid colors
-                        let r = (color[0] as f32 * intensity) as u8;
-                        let g = (color[1] as f32 * intensity) as u8;
-                        let b = (color[2] as f32 * intensity) as u8;
-
-                        let curr = s.data[i];
-                        s.data[i] = [
+                    for curr in &mut s.data[..cnt] {
+                        *curr = [
                             curr[0].saturating_add(r),
                             curr[1].saturating_add(g),
                             curr[2].saturating_add(b)
@@ -1057,15 +851,12 @@ impl LightingEngine {
                     if let Some(t) = targets { if !t.contains(&s.id) { continue; } }
                     
                     let cnt = s.pixel_count.min(s.data.len());
-                    for i in 0..cnt { s.data[i] = c; }
+                    s.data[..cnt].fill(c);
                 }
             }
             "Flash" => {
                 // Use EXACT same color reading as masks
-                let color = effect.params.get("color").and_then(|v| {
-                    let arr = v.as_array()?;
-                    Some([arr.get(0)?.as_u64()? as u8, arr.get(1)?.as_u64()? as u8, arr.get(2)?.as_u64()? as u8])
-                }).unwrap_or([255, 255, 255]);
+                let color = color_param(&effect.params, "color").unwrap_or([255, 255, 255]);
 
                 let rate_str = effect.params.get("rate").and_then(|v| v.as_str()).unwrap_or("1 Bar");
                 let divisor = match rate_str {
@@ -1086,26 +877,22 @@ impl LightingEngine {
 
                 // Always apply the color with intensity - don't black out
                 // This prevents the "crash to black" issue
+                let r = (color[0] as f32 * intensity) as u8;
+                let g = (color[1] as f32 * intensity) as u8;
+                let b = (color[2] as f32 * intensity) as u8;
+
                 for s in strips.iter_mut() {
                     if let Some(t) = targets { if !t.contains(&s.id) { continue; } }
                     
                     let cnt = s.pixel_count.min(s.data.len());
-                    for i in 0..cnt {
-                        let r = (color[0] as f32 * intensity) as u8;
-                        let g = (color[1] as f32 * intensity) as u8;
-                        let b = (color[2] as f32 * intensity) as u8;
-                        s.data[i] = [r, g, b];
-                    }
+                    s.data[..cnt].fill([r, g, b]);
                 }
             }
             "Sparkle" => {
                 let density = effect.params.get("density").and_then(|v| v.as_f64()).unwrap_or(0.05) as f32;
                 let life = effect.params.get("life").and_then(|v| v.as_f64()).unwrap_or(0.2) as f32;
                 let decay = effect.params.get("decay").and_then(|v| v.as_f64()).unwrap_or(5.0);
-                let color = effect.params.get("color").and_then(|v| {
-                    let arr = v.as_array()?;
-                    Some([arr.get(0)?.as_u64()? as u8, arr.get(1)?.as_u64()? as u8, arr.get(2)?.as_u64()? as u8])
-                }).unwrap_or([255, 255, 255]);
+                let color = color_param(&effect.params, "color").unwrap_or([255, 255, 255]);
 
                 const MAX_SPARKLES: usize = 500;
 
@@ -1132,6 +919,8 @@ impl LightingEngine {
                 }
 
                 // Render and cleanup sparkles
+                self.index_strips(strips);
+                let strip_index = &self.strip_index;
                 self.sparkle_states.retain(|sparkle| {
                     // Filter: Only process sparkles belonging to targeted strips of THIS effect
                     if let Some(t) = targets { if !t.contains(&sparkle.strip_id) { return true; } }
@@ -1141,20 +930,13 @@ impl LightingEngine {
                         return false;
                     }
 
-                    if let Some(strip) = strips.iter_mut().find(|s| s.id == sparkle.strip_id) {
+                    if let Some(&i) = strip_index.get(&sparkle.strip_id) {
+                        let strip = &mut strips[i];
                         if sparkle.pixel_index < strip.data.len() {
                             let progress = age / life;
                             let intensity = (1.0 - progress).powf(decay as f32).clamp(0.0, 1.0);
 
-                            let r = (sparkle.color[0] as f32 * intensity) as u8;
-                            let g = (sparkle.color[1] as f32 * intensity) as u8;
-                            let b = (sparkle.color[2] as f32 * intensity) as u8;
-
-                            strip.data[sparkle.pixel_index] = [
-                                strip.data[sparkle.pixel_index][0].saturating_add(r),
-                                strip.data[sparkle.pixel_index][1].saturating_add(g),
-                                strip.data[sparkle.pixel_index][2].saturating_add(b),
-                            ];
+                            add_scaled(&mut strip.data[sparkle.pixel_index], sparkle.color, intensity);
                         }
                     }
 
@@ -1163,19 +945,9 @@ impl LightingEngine {
             }
             "ColorWash" => {
                 // Parse parameters
-                let color_a = effect.params.get("color_a").and_then(|v| {
-                    let arr = v.as_array()?;
-                    Some([arr.get(0)?.as_u64()? as u8,
-                          arr.get(1)?.as_u64()? as u8,
-                          arr.get(2)?.as_u64()? as u8])
-                }).unwrap_or([255, 0, 0]);
-
-                let color_b = effect.params.get("color_b").and_then(|v| {
-                    let arr = v.as_array()?;
-                    Some([arr.get(0)?.as_u64()? as u8,
-                          arr.get(1)?.as_u64()? as u8,
-                          arr.get(2)?.as_u64()? as u8])
-                }).unwrap_or([0, 0, 255]);
+                let color_a = color_param(&effect.params, "color_a").unwrap_or([255, 0, 0]);
+
+                let color_b = color_param(&effect.params, "color_b").unwrap_or([0, 0, 255]);
 
                 let sync_to_beat = effect.params.get("sync_to_beat").and_then(|v| v.as_bool()).unwrap_or(false);
                 let rate_str = effect.params.get("rate").and_then(|v| v.as_str()).unwrap_or("1 Bar");
@@ -1213,26 +985,14 @@ impl LightingEngine {
                         }
                     }
 
-                    for pixel in &mut strip.data {
-                        *pixel = [r, g, b];
-                    }
+                    strip.data.fill([r, g, b]);
                 }
             }
             "GlitchSparkle" => {
                 // Parse parameters
-                let background_color = effect.params.get("background_color").and_then(|v| {
-                    let arr = v.as_array()?;
-                    Some([arr.get(0)?.as_u64()? as u8,
-                          arr.get(1)?.as_u64()? as u8,
-                          arr.get(2)?.as_u64()? as u8])
-                }).unwrap_or([0, 0, 0]);
-
-                let sparkle_color = effect.params.get("sparkle_color").and_then(|v| {
-                    let arr = v.as_array()?;
-                    Some([arr.get(0)?.as_u64()? as u8,
-                          arr.get(1)?.as_u64()? as u8,
-                          arr.get(2)?.as_u64()? as u8])
-                }).unwrap_or([255, 255, 255]);
+                let background_color = color_param(&effect.params, "background_color").unwrap_or([0, 0, 0]);
+
+                let sparkle_color = color_param(&effect.params, "sparkle_color").unwrap_or([255, 255, 255]);
 
                 let density = effect.params.get("density").and_then(|v| v.as_f64()).unwrap_or(0.05) as f32;
                 let fade_time = effect.params.get("fade_time").and_then(|v| v.as_f64()).unwrap_or(0.3) as f32;
@@ -1248,30 +1008,19 @@ impl LightingEngine {
                         }
                     }
 
-                    for pixel in &mut strip.data {
-                        *pixel = background_color;
-                    }
+                    strip.data.fill(background_color);
                 }
 
                 // Step 2: Spawn new sparkles using accumulator for constant rate
                 if self.glitch_states.len() < MAX_GLITCH_SPARKLES {
-                    // Count total pixels in targeted strips
-                    let mut total_pixels = 0;
-                    let mut eligible_pixels = Vec::new();
-
-                    for strip in strips.iter() {
-                        if let Some(t) = targets {
-                            if !t.contains(&strip.id) {
-                                continue;
-                            }
-                        }
-
-                        let pixel_count = strip.pixel_count.min(strip.data.len());
-                        for i in 0..pixel_count {
-                            eligible_pixels.push((strip.id, i));
-                            total_pixels += 1;
-                        }
-                    }
+                    // Targeted strips are treated as one flat run of pixels, in strip order.
+                    // Only the total is needed up front; a sparkle's flat index is mapped
+                    // back to its strip when it spawns, so no per-pixel list is built.
+                    let is_target = |strip: &PixelStrip| targets.map_or(true, |t| t.contains(&strip.id));
+                    let total_pixels: usize = strips.iter()
+                        .filter(|strip| is_target(strip))
+                        .map(|strip| strip.pixel_count.min(strip.data.len()))
+                        .sum();
 
                     // Calculate expected sparkles this frame and accumulate
                     // Density represents target percentage of pixels sparkling at any time
@@ -1288,13 +1037,26 @@ impl LightingEngine {
 
                     // Spawn sparkles at random positions
                     for _ in 0..sparkles_to_spawn.min(MAX_GLITCH_SPARKLES - self.glitch_states.len()) {
-                        if eligible_pixels.is_empty() {
+                        if total_pixels == 0 {
                             break;
                         }
 
                         // Pick a random pixel
-                        let idx = (rand::random::<f32>() * eligible_pixels.len() as f32) as usize % eligible_pixels.len();
-                        let (strip_id, pixel_index) = eligible_pixels[idx];
+                        let mut idx = (rand::random::<f32>() * total_pixels as f32) as usize % total_pixels;
+                        let Some((strip_id, pixel_index)) = strips.iter()
+                            .filter(|strip| is_target(strip))
+                            .find_map(|strip| {
+                                let pixel_count = strip.pixel_count.min(strip.data.len());
+                                if idx < pixel_count {
+                                    Some((strip.id, idx))
+                                } else {
+                                    idx -= pixel_count;
+                                    None
+                                }
+                            })
+                        else {
+                            break;
+                        };
 
                         self.glitch_states.push(GlitchPixel {
                             strip_id,
@@ -1306,6 +1068,8 @@ impl LightingEngine {
                 }
 
                 // Step 3: Render and cleanup sparkles
+                self.index_strips(strips);
+                let strip_index = &self.strip_index;
                 self.glitch_states.retain(|sparkle| {
                     // Filter by target strips
                     if let Some(t) = targets {
@@ -1321,21 +1085,14 @@ impl LightingEngine {
                     }
 
                     // Render to strip
-                    if let Some(strip) = strips.iter_mut().find(|s| s.id == sparkle.strip_id) {
+                    if let Some(&i) = strip_index.get(&sparkle.strip_id) {
+                        let strip = &mut strips[i];
                         if sparkle.pixel_index < strip.data.len() {
                             let progress = age / fade_time;
                             let intensity = (1.0 - progress).powf(decay as f32).clamp(0.0, 1.0);
 
-                            let r = (sparkle.color[0] as f32 * intensity) as u8;
-                            let g = (sparkle.color[1] as f32 * intensity) as u8;
-                            let b = (sparkle.color[2] as f32 * intensity) as u8;
-
                             // Additive blending on top of background
-                            strip.data[sparkle.pixel_index] = [
-                                strip.data[sparkle.pixel_index][0].saturating_add(r),
-                                strip.data[sparkle.pixel_index][1].saturating_add(g),
-                                strip.data[sparkle.pixel_index][2].saturating_add(b),
-                            ];
+                            add_scaled(&mut strip.data[sparkle.pixel_index], sparkle.color, intensity);
                         }
                     }
 
@@ -1344,12 +1101,7 @@ impl LightingEngine {
             }
             "PulseWave" => {
                 // Parse parameters
-                let color = effect.params.get("color").and_then(|v| {
-                    let arr = v.as_array()?;
-                    Some([arr.get(0)?.as_u64()? as u8,
-                          arr.get(1)?.as_u64()? as u8,
-                          arr.get(2)?.as_u64()? as u8])
-                }).unwrap_or([255, 255, 255]);
+                let color = color_param(&effect.params, "color").unwrap_or([255, 255, 255]);
 
                 let sync = effect.params.get("sync").and_then(|v| v.as_bool()).unwrap_or(true);
                 let rate_str = effect.params.get("rate").and_then(|v| v.as_str()).unwrap_or("1/4");
@@ -1376,10 +1128,8 @@ impl LightingEngine {
                     manual_speed
                 } as f32;
 
-                // Collect strip info and update positions
-                let mut strip_positions: Vec<(u64, usize, f32)> = Vec::new();
-
-                for strip in strips.iter() {
+                // Update each strip's pulse position and render it in the same pass
+                for strip in strips.iter_mut() {
                     if let Some(t) = targets {
                         if !t.contains(&strip.id) {
                             continue;
@@ -1426,57 +1176,33 @@ impl LightingEngine {
                         0.0
                     };
 
-                    strip_positions.push((strip.id, strip.pixel_count, position));
-                }
-
-                // Now render pulses to strips
-                for (strip_id, pixel_count, position) in strip_positions {
-                    if let Some(strip_mut) = strips.iter_mut().find(|s| s.id == strip_id) {
-                        for i in 0..pixel_count {
-                            let pixel_pos = i as f32;
-                            let distance = (pixel_pos - position).abs();
-
-                            if distance < tail_length {
-                                let intensity = (1.0 - distance / tail_length).powf(decay).clamp(0.0, 1.0);
-                                let r = (color[0] as f32 * intensity) as u8;
-                                let g = (color[1] as f32 * intensity) as u8;
-                                let b = (color[2] as f32 * intensity) as u8;
-
-                                if i < strip_mut.data.len() {
-                                    strip_mut.data[i] = [
-                                        strip_mut.data[i][0].saturating_add(r),
-                                        strip_mut.data[i][1].saturating_add(g),
-                                        strip_mut.data[i][2].saturating_add(b),
-                                    ];
-                                }
-                            }
+                    // Only pixels within tail_length of the head can light up
+                    let pixel_limit = strip.pixel_count.min(strip.data.len());
+                    let first = (position - tail_length).floor().max(0.0) as usize;
+                    let last = ((position + tail_length).ceil().max(0.0) as usize)
+                        .saturating_add(1)
+                        .min(pixel_limit);
+
+                    for i in first..last {
+                        let pixel_pos = i as f32;
+                        let distance = (pixel_pos - position).abs();
+
+                        if distance < tail_length {
+                            let intensity = (1.0 - distance / tail_length).powf(decay).clamp(0.0, 1.0);
+                            add_scaled(&mut strip.data[i], color, intensity);
                         }
                     }
                 }
             }
             "ZoneAlternate" => {
                 // Parse parameters
-                let group_a: Vec<u64> = effect.params.get("group_a_strips")
-                    .and_then(|v| serde_json::from_value(v.clone()).ok())
-                    .unwrap_or_default();
-
-                let group_b: Vec<u64> = effect.params.get("group_b_strips")
-                    .and_then(|v| serde_json::from_value(v.clone()).ok())
-                    .unwrap_or_default();
-
-                let group_a_color = effect.params.get("group_a_color").and_then(|v| {
-                    let arr = v.as_array()?;
-                    Some([arr.get(0)?.as_u64()? as u8,
-                          arr.get(1)?.as_u64()? as u8,
-                          arr.get(2)?.as_u64()? as u8])
-                }).unwrap_or([255, 0, 0]);
-
-                let group_b_color = effect.params.get("group_b_color").and_then(|v| {
-                    let arr = v.as_array()?;
-                    Some([arr.get(0)?.as_u64()? as u8,
-                          arr.get(1)?.as_u64()? as u8,
-                          arr.get(2)?.as_u64()? as u8])
-                }).unwrap_or([0, 0, 255]);
+                let group_a = id_list_param(&effect.params, "group_a_strips").unwrap_or_default();
+
+                let group_b = id_list_param(&effect.params, "group_b_strips").unwrap_or_default();
+
+                let group_a_color = color_param(&effect.params, "group_a_color").unwrap_or([255, 0, 0]);
+
+                let group_b_color = color_param(&effect.params, "group_b_color").unwrap_or([0, 0, 255]);
 
                 let rate_str = effect.params.get("rate").and_then(|v| v.as_str()).unwrap_or("1/4");
                 let mode = effect.params.get("mode").and_then(|v| v.as_str()).unwrap_or("Swap");
@@ -1530,9 +1256,7 @@ impl LightingEngine {
                         continue; // Skip strips not in either group
                     };
 
-                    for pixel in &mut strip.data {
-                        *pixel = color;
-                    }
+                    strip.data.fill(color);
                 }
             }
             _ => {}
@@ -1540,6 +1264,304 @@ impl LightingEngine {
     }
 }
 
+/// Where to send sACN for `network`: `Some(None)` for multicast, `Some(Some(addr))`
+/// for unicast, or `None` if the unicast IP doesn't parse. An invalid IP must not
+/// fall back to multicast, so output is skipped instead.
+fn resolve_destination(network: &NetworkConfig) -> Option<Option<std::net::SocketAddr>> {
+    if network.use_multicast {
+        Some(None)
+    } else {
+        let ip = network.unicast_ip.parse::<std::net::IpAddr>().ok()?;
+        Some(Some(std::net::SocketAddr::new(ip, 5568)))
+    }
+}
+
+/// Reset a strip to black, sized to its pixel count.
+///
+/// Reuses the strip's existing buffer instead of allocating a fresh Vec every
+/// frame; `resize` only allocates when the pixel count grows.
+fn clear_strip(strip: &mut PixelStrip) {
+    strip.data.clear();
+    strip.data.resize(strip.pixel_count, [0, 0, 0]);
+}
+
+fn clear_strips(strips: &mut [PixelStrip]) {
+    for strip in strips {
+        clear_strip(strip);
+    }
+}
+
+/// Clear every strip and accumulate the kernels onto it, in layer order.
+///
+/// Each kernel only visits the strips within its vertical reach; `hits` is
+/// scratch space for the (strip, kernel) pairs, kept across frames.
+fn composite_masks(kernels: &[MaskKernel], strips: &mut [PixelStrip], layout: &LayoutCache, hits: &mut Vec<(usize, usize)>) {
+    // (strip, kernel) pairs for every strip within a mask's vertical reach.
+    // Sorting groups them by strip while keeping masks in their layer order.
+    hits.clear();
+    for (k, kernel) in kernels.iter().enumerate() {
+        let (y0, y1) = kernel.y_range();
+        hits.extend(layout.strips_in_y_range(y0, y1).iter().map(|&i| (i, k)));
+    }
+    hits.sort_unstable();
+
+    let mut hits = hits.iter().peekable();
+    for (i, strip) in strips.iter_mut().enumerate() {
+        clear_strip(strip);
+        let geometry = layout.strip(i);
+        while let Some(&(_, k)) = hits.next_if(|&&(s, _)| s == i) {
+            kernels[k].apply(strip, geometry);
+        }
+    }
+}
+
+/// A mask with its parameters resolved for the current frame.
+///
+/// Parameter lookups, LFOs and animation phase are evaluated once per frame in
+/// [`LightingEngine::prepare_mask`]; [`MaskKernel::apply`] then only does the
+/// per-pixel work for one strip, so every mask can be run on a strip while its
+/// pixels are still hot in cache.
+enum MaskKernel {
+    Scanner { kernel: ScannerMask, debug_fill: bool },
+    Orbit(OrbitKernel),
+    Radial(RadialKernel),
+    Burst(RadialKernel),
+}
+
+/// Orbit bar, in mask-local coordinates (the orbit mask has no rotation).
+struct OrbitKernel {
+    mx: f32,
+    my: f32,
+    /// World-space box covering the part of the mask the bar can light
+    x0: f32,
+    x1: f32,
+    y0: f32,
+    y1: f32,
+    /// Mask half-extents with edge tolerance
+    limit_x: f32,
+    limit_y: f32,
+    bar_center_x: f32,
+    bar_center_y: f32,
+    is_horizontal: bool,
+    bar_width: f32,
+    inv_bar_width: f32,
+    hard_edge: bool,
+    color: [u8; 3],
+}
+
+/// Disc with linear falloff, shared by the radial and burst masks.
+struct RadialKernel {
+    mx: f32,
+    my: f32,
+    radius: f32,
+    inv_radius: f32,
+    radius_sq: f32,
+    color: [u8; 3],
+    debug_fill: bool,
+}
+
+impl MaskKernel {
+    /// Vertical band outside which the mask can't light any pixel.
+    fn y_range(&self) -> (f32, f32) {
+        match self {
+            MaskKernel::Scanner { kernel, debug_fill } => {
+                let [_, _, y0, y1] = if *debug_fill { kernel.mask_bounds() } else { kernel.bar_bounds() };
+                (y0, y1)
+            }
+            MaskKernel::Orbit(orbit) => (orbit.y0, orbit.y1),
+            MaskKernel::Radial(disc) | MaskKernel::Burst(disc) => (disc.my - disc.radius, disc.my + disc.radius),
+        }
+    }
+
+    /// Accumulate the mask onto one strip.
+    fn apply(&self, strip: &mut PixelStrip, geometry: &StripGeometry) {
+        if self.reaches(strip, geometry) {
+            self.apply_pixels(strip, geometry);
+        }
+    }
+
+    /// Cheap per-strip reject: false when the mask can't light any of its pixels.
+    fn reaches(&self, strip: &PixelStrip, geometry: &StripGeometry) -> bool {
+        match self {
+            MaskKernel::Scanner { kernel, debug_fill } => {
+                let [x0, x1, y0, y1] = if *debug_fill { kernel.mask_bounds() } else { kernel.bar_bounds() };
+                geometry.overlaps_box(x0, x1, y0, y1)
+            }
+            MaskKernel::Orbit(orbit) => geometry.overlaps_box(orbit.x0, orbit.x1, orbit.y0, orbit.y1),
+            MaskKernel::Radial(disc) => {
+                // Radial lays flipped strips out leftwards from strip.x, so it
+                // doesn't use the shared layout cache
+                let far_x = if strip.flipped {
+                    strip.x - strip.pixel_count.saturating_sub(1) as f32 * strip.spacing
+                } else {
+                    strip.x + strip.pixel_count.saturating_sub(1) as f32 * strip.spacing
+                };
+                strip.pixel_count > 0
+                    && span_overlaps_disc(strip.x.min(far_x), strip.x.max(far_x), strip.y, disc.mx, disc.my, disc.radius)
+            }
+            MaskKernel::Burst(disc) => geometry.overlaps_disc(disc.mx, disc.my, disc.radius),
+        }
+    }
+
+    /// Accumulate the mask onto every pixel of one strip, with no per-strip reject.
+    fn apply_pixels(&self, strip: &mut PixelStrip, geometry: &StripGeometry) {
+        match self {
+            MaskKernel::Scanner { kernel, debug_fill } => {
+                if *debug_fill {
+                    // Visualization: show everything the mask considers "inside"
+                    kernel.fill_pixels(strip, geometry);
+                } else {
+                    kernel.apply_pixels(strip, geometry);
+                }
+            }
+            MaskKernel::Orbit(orbit) => orbit.apply(strip, geometry),
+            MaskKernel::Radial(disc) => disc.apply_radial(strip),
+            MaskKernel::Burst(disc) => disc.apply_burst(strip, geometry),
+        }
+    }
+}
+
+impl OrbitKernel {
+    /// `bar_center_x`/`bar_center_y` are relative to the mask center.
+    fn new(
+        mx: f32, my: f32, width: f32, height: f32,
+        bar_center_x: f32, bar_center_y: f32, is_horizontal: bool,
+        bar_width: f32, hard_edge: bool, color: [u8; 3],
+    ) -> Self {
+        let half_w = width / 2.0;
+        let half_h = height / 2.0;
+
+        // World-space box covering the part of the mask the bar can light
+        let (x0, x1, y0, y1) = if is_horizontal {
+            (mx - half_w, mx + half_w,
+             (my + bar_center_y - bar_width).max(my - half_h), (my + bar_center_y + bar_width).min(my + half_h))
+        } else {
+            ((mx + bar_center_x - bar_width).max(mx - half_w), (mx + bar_center_x + bar_width).min(mx + half_w),
+             my - half_h, my + half_h)
+        };
+
+        // Mask bounds with edge tolerance, and the falloff reciprocal
+        const EPSILON: f32 = 0.0001;
+        OrbitKernel {
+            mx, my,
+            x0, x1, y0, y1,
+            limit_x: half_w + EPSILON,
+            limit_y: half_h + EPSILON,
+            bar_center_x, bar_center_y, is_horizontal,
+            bar_width,
+            inv_bar_width: 1.0 / bar_width,
+            hard_edge,
+            color,
+        }
+    }
+
+    fn apply(&self, strip: &mut PixelStrip, geometry: &StripGeometry) {
+        // Every pixel on the strip shares its Y, so the vertical bounds check
+        // (no rotation for orbit) is done once per strip
+        let mask_local_y = geometry.y - self.my;
+        if !(mask_local_y >= -self.limit_y && mask_local_y <= self.limit_y) {
+            return;
+        }
+        let pixel_limit = strip.pixel_count.min(strip.data.len());
+
+        for (pixel, &px) in strip.data[..pixel_limit].iter_mut().zip(&geometry.xs) {
+            // Transform to mask's local coordinate system (no rotation for orbit)
+            let mask_local_x = px - self.mx;
+
+            // Check if pixel is within mask bounds
+            if mask_local_x >= -self.limit_x && mask_local_x <= self.limit_x {
+
+                // Calculate distance to bar based on bar orientation
+                let dist_to_bar = if self.is_horizontal {
+                    // Bar is horizontal (on left/right edges) - check Y distance
+                    (mask_local_y - self.bar_center_y).abs()
+                } else {
+                    // Bar is vertical (on top/bottom edges) - check X distance
+                    (mask_local_x - self.bar_center_x).abs()
+                };
+
+                if dist_to_bar <= self.bar_width {
+                    let intensity = if self.hard_edge {
+                        1.0
+                    } else {
+                        (1.0 - dist_to_bar * self.inv_bar_width).max(0.0)
+                    };
+
+                    if intensity > 0.0 {
+                        add_scaled(pixel, self.color, intensity);
+                    }
+                }
+            }
+        }
+    }
+}
+
+impl RadialKernel {
+    fn new(mx: f32, my: f32, radius: f32, color: [u8; 3], debug_fill: bool) -> Self {
+        RadialKernel {
+            mx, my, radius,
+            inv_radius: 1.0 / radius,
+            // A non-positive radius covers nothing
+            radius_sq: radius.max(0.0) * radius.max(0.0),
+            color,
+            debug_fill,
+        }
+    }
+
+    fn apply_radial(&self, strip: &mut PixelStrip) {
+        let (mx, my) = (self.mx, self.my);
+
+        // ALIGNMENT FIX: Start at 0
+        let start_idx_x = 0.0;
+        // Vertical distance is the same for every pixel on the strip
+        let dy2 = (strip.y - my).powi(2);
+
+        let pixel_limit = strip.pixel_count.min(strip.data.len());
+        let (x, spacing, flipped) = (strip.x, strip.spacing, strip.flipped);
+        for (i, pixel) in strip.data[..pixel_limit].iter_mut().enumerate() {
+            let local_x = start_idx_x + (i as f32 * spacing);
+
+            let px = if flipped {
+                 x - local_x
+            } else {
+                 x + local_x
+            };
+
+            // Containment is tested on squared distance; sqrt only for pixels inside
+            let dist_sq = (px - mx).powi(2) + dy2;
+            if dist_sq < self.radius_sq {
+                 if self.debug_fill {
+                     *pixel = [255, 255, 255];
+                     continue;
+                 }
+                 let dist = dist_sq.sqrt();
+                 let intensity = 1.0 - (dist * self.inv_radius);
+                 let intensity = intensity.clamp(0.0, 1.0);
+
+                 add_scaled(pixel, self.color, intensity);
+            }
+        }
+    }
+
+    fn apply_burst(&self, strip: &mut PixelStrip, geometry: &StripGeometry) {
+        let (mx, my) = (self.mx, self.my);
+        // Vertical distance is the same for every pixel on the strip
+        let dy2 = (geometry.y - my).powi(2);
+        let pixel_count = strip.pixel_count.min(strip.data.len());
+        for (pixel, &px) in strip.data[..pixel_count].iter_mut().zip(&geometry.xs) {
+
+            // Containment is tested on squared distance; sqrt only for pixels inside
+            let dist_sq = (px - mx).powi(2) + dy2;
+            if dist_sq < self.radius_sq {
+                let dist = dist_sq.sqrt();
+                let intensity = (1.0 - dist * self.inv_radius).clamp(0.0, 1.0);
+
+                add_scaled(pixel, self.color, intensity);
+            }
+        }
+    }
+}
+
 pub fn hsv_to_rgb(h: f32, s: f32, v: f32) -> [u8; 3] {
     let h_i = (h * 6.0) as i32;
     let f = h * 6.0 - h_i as f32;
@@ -1559,6 +1581,32 @@ pub fn hsv_to_rgb(h: f32, s: f32, v: f32) -> [u8; 3] {
     [(r * 255.0) as u8, (g * 255.0) as u8, (b * 255.0) as u8]
 }
 
+/// Read an `[r, g, b]` color parameter.
+///
+/// Components are taken from the first three array entries and truncated to u8.
+fn color_param(params: &std::collections::HashMap<String, serde_json::Value>, key: &str) -> Option<[u8; 3]> {
+    let arr = params.get(key)?.as_array()?;
+    Some([arr.get(0)?.as_u64()? as u8, arr.get(1)?.as_u64()? as u8, arr.get(2)?.as_u64()? as u8])
+}
+
+/// Read a list of strip IDs, borrowing the JSON array instead of cloning it
+/// through `serde_json::from_value`.
+///
+/// Like `from_value`, any entry that isn't a non-negative integer rejects the
+/// whole list.
+fn id_list_param(params: &std::collections::HashMap<String, serde_json::Value>, key: &str) -> Option<Vec<u64>> {
+    params.get(key)?.as_array()?.iter().map(serde_json::Value::as_u64).collect()
+}
+
+/// Source channel index (into an RGB pixel) for each output byte of a strip's color order
+fn channel_order(color_order: &str) -> [usize; 3] {
+    match color_order {
+        "GRB" => [1, 0, 2],
+        "BGR" => [2, 1, 0],
+        _ => [0, 1, 2], // RGB
+    }
+}
+
 /// Apply LFO modulation to a parameter value
 fn apply_lfo_modulation(
     base_value: f32,
@@ -1621,3 +1669,149 @@ fn apply_lfo_modulation(
     let modulation = wave_value * depth;
     base_value * (1.0 + modulation)
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use rand::{Rng, SeedableRng};
+    use rand::rngs::StdRng;
+
+    fn create_test_strip(id: u64, x: f32, y: f32, flipped: bool, pixel_count: usize, spacing: f32) -> PixelStrip {
+        PixelStrip {
+            id,
+            universe: 1,
+            start_channel: 1,
+            pixel_count,
+            x,
+            y,
+            spacing,
+            flipped,
+            color_order: "RGB".to_string(),
+            data: vec![[0, 0, 0]; pixel_count],
+        }
+    }
+
+    /// Strips in a grid of rows, alternating direction, with a few oddballs.
+    fn test_layout() -> Vec<PixelStrip> {
+        let mut strips = Vec::new();
+        for row in 0..24 {
+            let y = 0.02 + row as f32 * 0.04;
+            strips.push(create_test_strip(row, 0.05, y, row % 2 == 1, 60, 0.015));
+        }
+        // Empty, single-pixel, wide-spaced, off-canvas and stacked strips
+        strips.push(create_test_strip(100, 0.5, 0.5, false, 0, 0.01));
+        strips.push(create_test_strip(101, 0.5, 0.51, true, 1, 0.01));
+        strips.push(create_test_strip(102, 0.9, 0.33, true, 30, 0.03));
+        strips.push(create_test_strip(103, -0.2, 1.1, false, 20, 0.02));
+        strips.push(create_test_strip(104, 0.3, 0.5, false, 40, 0.01));
+        strips
+    }
+
+    fn scanner(x: f32, y: f32, w: f32, h: f32, rot: f32, bar_pos: f32, bar_width: f32, hard_edge: bool, debug_fill: bool) -> MaskKernel {
+        MaskKernel::Scanner {
+            kernel: ScannerMask::new(x, y, w, h, rot, bar_pos, bar_width, hard_edge, [200, 40, 90]),
+            debug_fill,
+        }
+    }
+
+    /// Culled path, as run by `render_masks`.
+    fn composite(kernels: &[MaskKernel], strips: &mut [PixelStrip]) -> usize {
+        let mut layout = LayoutCache::new();
+        layout.refresh(strips);
+        let mut hits = Vec::new();
+        composite_masks(kernels, strips, &layout, &mut hits);
+        hits.len()
+    }
+
+    /// Reference: every kernel on every pixel of every strip, with positions
+    /// built from scratch and no Y-range or per-strip rejects.
+    fn brute_force(kernels: &[MaskKernel], strips: &mut [PixelStrip]) {
+        for strip in strips.iter_mut() {
+            clear_strip(strip);
+            let geometry = StripGeometry::from_strip(strip);
+            for kernel in kernels {
+                kernel.apply_pixels(strip, &geometry);
+            }
+        }
+    }
+
+    fn assert_matches_brute_force(kernels: &[MaskKernel], strips: &[PixelStrip]) -> usize {
+        let mut culled = strips.to_vec();
+        let mut expected = strips.to_vec();
+        let hits = composite(kernels, &mut culled);
+        brute_force(kernels, &mut expected);
+
+        for (got, want) in culled.iter().zip(&expected) {
+            assert_eq!(got.data, want.data, "strip {} differs from brute force", want.id);
+        }
+        hits
+    }
+
+    fn lit_pixels(strips: &[PixelStrip]) -> usize {
+        strips.iter().flat_map(|s| &s.data).filter(|p| **p != [0, 0, 0]).count()
+    }
+
+    #[test]
+    fn test_culled_masks_match_brute_force() {
+        let strips = test_layout();
+        let kernels = vec![
+            // Axis-aligned and rotated scanners, overlapping in the middle
+            scanner(0.5, 0.5, 0.6, 0.3, 0.0, 0.3, 0.05, false, false),
+            scanner(0.45, 0.55, 0.5, 0.2, 30.0, 0.7, 0.08, true, false),
+            scanner(0.5, 0.5, 0.8, 0.1, 90.0, 0.5, 0.04, false, false),
+            scanner(0.6, 0.4, 0.4, 0.4, 137.0, 0.1, 0.1, false, false),
+            scanner(0.3, 0.7, 0.3, 0.2, -45.0, 0.0, 0.05, true, true),
+            // Orbit with its bar on a horizontal and a vertical edge
+            MaskKernel::Orbit(OrbitKernel::new(0.5, 0.5, 0.5, 0.4, 0.25, 0.05, true, 0.06, false, [0, 255, 80])),
+            MaskKernel::Orbit(OrbitKernel::new(0.4, 0.6, 0.3, 0.6, -0.05, -0.3, false, 0.04, true, [90, 0, 255])),
+            // Discs over the same area, one in debug fill
+            MaskKernel::Radial(RadialKernel::new(0.5, 0.5, 0.25, [255, 0, 0], false)),
+            MaskKernel::Radial(RadialKernel::new(0.8, 0.3, 0.1, [0, 0, 0], true)),
+            MaskKernel::Burst(RadialKernel::new(0.55, 0.45, 0.3, [255, 100, 0], false)),
+            MaskKernel::Burst(RadialKernel::new(0.2, 0.9, 0.0, [255, 100, 0], false)),
+        ];
+
+        let hits = assert_matches_brute_force(&kernels, &strips);
+
+        // Make sure the test exercises both sides of the cull
+        assert!(hits < kernels.len() * strips.len(), "nothing was culled");
+        let mut lit = strips.clone();
+        brute_force(&kernels, &mut lit);
+        assert!(lit_pixels(&lit) > 500, "masks barely light the layout");
+    }
+
+    #[test]
+    fn test_random_masks_match_brute_force() {
+        let strips = test_layout();
+        let mut rng = StdRng::seed_from_u64(0x5ac4);
+
+        for _ in 0..200 {
+            let kernels: Vec<MaskKernel> = (0..rng.gen_range(1..6)).map(|_| {
+                let (x, y) = (rng.gen_range(-0.2..1.2), rng.gen_range(-0.2..1.2));
+                let color = [rng.gen(), rng.gen(), rng.gen()];
+                match rng.gen_range(0..4) {
+                    0 => scanner(
+                        x, y, rng.gen_range(0.0..0.8), rng.gen_range(0.0..0.8), rng.gen_range(-360.0..360.0),
+                        rng.gen_range(0.0..1.0), rng.gen_range(0.0..0.2), rng.gen(), rng.gen_bool(0.1),
+                    ),
+                    1 => {
+                        let (w, h): (f32, f32) = (rng.gen_range(0.05..0.8), rng.gen_range(0.05..0.8));
+                        let is_horizontal = rng.gen();
+                        let (bx, by) = if is_horizontal {
+                            (w / 2.0 * if rng.gen() { 1.0 } else { -1.0 }, rng.gen_range(-h / 2.0..h / 2.0))
+                        } else {
+                            (rng.gen_range(-w / 2.0..w / 2.0), h / 2.0 * if rng.gen() { 1.0 } else { -1.0 })
+                        };
+                        MaskKernel::Orbit(OrbitKernel::new(
+                            x, y, w, h, bx, by, is_horizontal, rng.gen_range(0.01..0.2), rng.gen(), color,
+                        ))
+                    }
+                    2 => MaskKernel::Radial(RadialKernel::new(x, y, rng.gen_range(0.0..0.5), color, rng.gen_bool(0.1))),
+                    _ => MaskKernel::Burst(RadialKernel::new(x, y, rng.gen_range(0.0..0.5), color, false)),
+                }
+            }).collect();
+
+            assert_matches_brute_force(&kernels, &strips);
+        }
+    }
+}
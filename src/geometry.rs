@@ -0,0 +1,331 @@
+//! # Strip Geometry Cache
+//!
+//! World-space pixel positions for every LED strip, computed once per frame
+//! and shared by all masks instead of being re-derived per mask per pixel.
+//!
+//! ## Layout
+//!
+//! Strips are horizontal, so every pixel on a strip shares the same Y. Each
+//! strip therefore stores a contiguous `Vec<f32>` of X positions plus a single
+//! scalar Y, which keeps the mask kernels reading unit-stride memory.
+//!
+//! Flipped strips run from `x + length` back towards `x`: index 0 maps to the
+//! far right and the last index sits at the strip origin. This matches the
+//! canvas renderer in `main.rs`.
+//!
+//! ## Early Reject
+//!
+//! Each strip also keeps its X extent so masks can skip strips that lie
+//! entirely outside their region before running any per-pixel math.
+//!
+//! Strip indices are additionally kept sorted by Y. A mask only ever covers
+//! a band of Y values, so [`LayoutCache::strips_in_y_range`] finds the
+//! candidate strips with two binary searches instead of visiting them all.
+
+use crate::model::PixelStrip;
+
+/// Cached world-space pixel positions for a single strip.
+pub struct StripGeometry {
+    /// X position of each pixel, indexed like `PixelStrip::data`
+    pub xs: Vec<f32>,
+    /// Y position shared by every pixel on the strip
+    pub y: f32,
+    /// Smallest and largest entries of `xs` (`INFINITY`/`NEG_INFINITY` when empty)
+    pub min_x: f32,
+    pub max_x: f32,
+    /// Pixel offsets from the strip origin, which only depend on the strip's shape
+    offsets: Vec<f32>,
+    /// `(pixel_count, spacing bits, flipped)` that `offsets` was built for
+    shape_key: Option<(usize, u32, bool)>,
+    /// Bits of the strip X that `xs` was built for
+    origin_key: Option<u32>,
+}
+
+/// Slack added to every overlap test so that rounding in the exact per-pixel
+/// tests can never disagree with the early reject.
+const BOUNDS_PAD: f32 = 1e-3;
+
+impl Default for StripGeometry {
+    fn default() -> Self {
+        Self {
+            xs: Vec::new(),
+            y: 0.0,
+            min_x: f32::INFINITY,
+            max_x: f32::NEG_INFINITY,
+            offsets: Vec::new(),
+            shape_key: None,
+            origin_key: None,
+        }
+    }
+}
+
+impl StripGeometry {
+    /// Build the geometry for a strip from scratch.
+    pub fn from_strip(strip: &PixelStrip) -> Self {
+        let mut geometry = Self::default();
+        geometry.sync(strip);
+        geometry
+    }
+
+    /// Bring the cached positions in line with `strip`, redoing only what changed.
+    ///
+    /// Pixel offsets are rebuilt when the pixel count, spacing or direction
+    /// change. A pure move (the common case while dragging a strip on the
+    /// canvas) only re-adds the new origin to the existing offsets, and an
+    /// unchanged strip costs nothing.
+    pub fn sync(&mut self, strip: &PixelStrip) {
+        self.y = strip.y;
+
+        let shape_key = (strip.pixel_count, strip.spacing.to_bits(), strip.flipped);
+        if self.shape_key != Some(shape_key) {
+            self.offsets.clear();
+            self.offsets.extend((0..strip.pixel_count).map(|pixel_index| {
+                if strip.flipped {
+                    (strip.pixel_count - 1).saturating_sub(pixel_index) as f32 * strip.spacing
+                } else {
+                    pixel_index as f32 * strip.spacing
+                }
+            }));
+            self.shape_key = Some(shape_key);
+            self.origin_key = None;
+        }
+
+        if self.origin_key != Some(strip.x.to_bits()) {
+            self.xs.clear();
+            self.xs.extend(self.offsets.iter().map(|offset| strip.x + offset));
+            self.min_x = self.xs.iter().copied().fold(f32::INFINITY, f32::min);
+            self.max_x = self.xs.iter().copied().fold(f32::NEG_INFINITY, f32::max);
+            self.origin_key = Some(strip.x.to_bits());
+        }
+    }
+
+    /// Whether any pixel could fall inside the axis-aligned box
+    /// `[x0, x1] × [y0, y1]`.
+    pub fn overlaps_box(&self, x0: f32, x1: f32, y0: f32, y1: f32) -> bool {
+        span_overlaps_box(self.min_x, self.max_x, self.y, x0, x1, y0, y1)
+    }
+
+    /// Whether any pixel could fall within `radius` of `(cx, cy)`.
+    pub fn overlaps_disc(&self, cx: f32, cy: f32, radius: f32) -> bool {
+        span_overlaps_disc(self.min_x, self.max_x, self.y, cx, cy, radius)
+    }
+}
+
+/// Box test for a horizontal run of pixels spanning `[min_x, max_x]` at height `y`.
+pub fn span_overlaps_box(min_x: f32, max_x: f32, y: f32, x0: f32, x1: f32, y0: f32, y1: f32) -> bool {
+    y >= y0 - BOUNDS_PAD && y <= y1 + BOUNDS_PAD && max_x >= x0 - BOUNDS_PAD && min_x <= x1 + BOUNDS_PAD
+}
+
+/// Disc test for a horizontal run of pixels spanning `[min_x, max_x]` at height `y`.
+pub fn span_overlaps_disc(min_x: f32, max_x: f32, y: f32, cx: f32, cy: f32, radius: f32) -> bool {
+    if min_x > max_x {
+        return false; // No pixels
+    }
+    // Closest point on the run to the disc center
+    let dx = cx.max(min_x).min(max_x) - cx;
+    let dy = y - cy;
+    let reach = radius + BOUNDS_PAD;
+    dx * dx + dy * dy <= reach * reach
+}
+
+/// Geometry for every strip in the layout, indexed like `AppState::strips`.
+#[derive(Default)]
+pub struct LayoutCache {
+    strips: Vec<StripGeometry>,
+    /// Strip indices ordered by Y, with the matching Y values alongside
+    by_y: Vec<usize>,
+    sorted_y: Vec<f32>,
+}
+
+impl LayoutCache {
+    pub fn new() -> Self {
+        Self::default()
+    }
+
+    /// Bring the cache in line with the current strip layout.
+    ///
+    /// Per-strip buffers are kept across frames and only the strips that
+    /// changed are recomputed (see [`StripGeometry::sync`]). The Y ordering is
+    /// rebuilt only when a strip moved vertically or the strip count changed.
+    pub fn refresh(&mut self, strips: &[PixelStrip]) {
+        let mut order_dirty = self.strips.len() != strips.len();
+        self.strips.resize_with(strips.len(), StripGeometry::default);
+        for (geometry, strip) in self.strips.iter_mut().zip(strips) {
+            order_dirty |= geometry.y.to_bits() != strip.y.to_bits();
+            geometry.sync(strip);
+        }
+
+        if order_dirty {
+            self.by_y.clear();
+            self.by_y.extend(0..self.strips.len());
+            let geometries = &self.strips;
+            self.by_y.sort_by(|&a, &b| geometries[a].y.total_cmp(&geometries[b].y));
+            self.sorted_y.clear();
+            self.sorted_y.extend(self.by_y.iter().map(|&i| geometries[i].y));
+        }
+    }
+
+    /// Indices of the strips whose Y lies within `[y0, y1]` (padded like the
+    /// overlap tests), in ascending Y order.
+    pub fn strips_in_y_range(&self, y0: f32, y1: f32) -> &[usize] {
+        let first = self.sorted_y.partition_point(|&y| y < y0 - BOUNDS_PAD);
+        let last = self.sorted_y.partition_point(|&y| y <= y1 + BOUNDS_PAD);
+        &self.by_y[first..last.max(first)]
+    }
+
+    /// Geometry for the strip at `index` in the slice last passed to `refresh`.
+    pub fn strip(&self, index: usize) -> &StripGeometry {
+        &self.strips[index]
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    /// Helper to create a test strip
+    fn create_test_strip(id: u64, x: f32, y: f32, flipped: bool, pixel_count: usize) -> PixelStrip {
+        PixelStrip {
+            id,
+            universe: 1,
+            start_channel: 1,
+            pixel_count,
+            x,
+            y,
+            spacing: 0.01,
+            flipped,
+            color_order: "RGB".to_string(),
+            data: vec![[0, 0, 0]; pixel_count],
+        }
+    }
+
+    /// Refresh `cache` and check every strip and Y query against geometry built from scratch.
+    fn assert_matches_scratch(cache: &mut LayoutCache, strips: &[PixelStrip]) {
+        cache.refresh(strips);
+
+        for (i, strip) in strips.iter().enumerate() {
+            let fresh = StripGeometry::from_strip(strip);
+            let cached = cache.strip(i);
+            assert_eq!(cached.xs, fresh.xs, "strip {} xs", strip.id);
+            assert_eq!(cached.y, fresh.y, "strip {} y", strip.id);
+            assert_eq!(cached.min_x, fresh.min_x, "strip {} min_x", strip.id);
+            assert_eq!(cached.max_x, fresh.max_x, "strip {} max_x", strip.id);
+        }
+
+        for &(y0, y1) in &[(-1.0, 2.0), (0.0, 0.25), (0.2, 0.5), (0.5, 0.5), (0.6, 0.9), (0.9, 0.1)] {
+            let mut found = cache.strips_in_y_range(y0, y1).to_vec();
+            let ys: Vec<f32> = found.iter().map(|&i| strips[i].y).collect();
+            assert!(ys.windows(2).all(|w| w[0] <= w[1]), "range ({}, {}) not in Y order: {:?}", y0, y1, ys);
+
+            found.sort_unstable();
+            let expected: Vec<usize> = strips.iter().enumerate()
+                .filter(|(_, s)| s.y >= y0 - BOUNDS_PAD && s.y <= y1 + BOUNDS_PAD)
+                .map(|(i, _)| i)
+                .collect();
+            assert_eq!(found, expected, "range ({}, {})", y0, y1);
+        }
+    }
+
+    #[test]
+    fn test_from_strip_positions() {
+        let geometry = StripGeometry::from_strip(&create_test_strip(1, 0.2, 0.5, false, 3));
+        assert_eq!(geometry.xs, vec![0.2, 0.2 + 0.01, 0.2 + 0.02]);
+        assert_eq!((geometry.min_x, geometry.max_x), (0.2, 0.2 + 0.02));
+
+        // Flipped strips start at the far end
+        let geometry = StripGeometry::from_strip(&create_test_strip(1, 0.2, 0.5, true, 3));
+        assert_eq!(geometry.xs, vec![0.2 + 0.02, 0.2 + 0.01, 0.2]);
+        assert_eq!((geometry.min_x, geometry.max_x), (0.2, 0.2 + 0.02));
+
+        let geometry = StripGeometry::from_strip(&create_test_strip(1, 0.2, 0.5, false, 0));
+        assert!(geometry.xs.is_empty());
+        assert!(geometry.min_x > geometry.max_x);
+    }
+
+    #[test]
+    fn test_move_strip() {
+        let mut strips = vec![
+            create_test_strip(1, 0.0, 0.2, false, 40),
+            create_test_strip(2, 0.3, 0.5, true, 25),
+            create_test_strip(3, 0.6, 0.8, false, 60),
+        ];
+        let mut cache = LayoutCache::new();
+        assert_matches_scratch(&mut cache, &strips);
+
+        // Horizontal only: Y order unchanged
+        strips[1].x = 0.45;
+        assert_matches_scratch(&mut cache, &strips);
+
+        // Vertical: strip 3 moves from the bottom of the Y order to the top
+        strips[2].y = 0.1;
+        assert_matches_scratch(&mut cache, &strips);
+
+        // Both at once, onto the same Y as another strip
+        strips[0].x = 0.7;
+        strips[0].y = 0.5;
+        assert_matches_scratch(&mut cache, &strips);
+    }
+
+    #[test]
+    fn test_flip_strip() {
+        let mut strips = vec![create_test_strip(1, 0.1, 0.4, false, 30)];
+        let mut cache = LayoutCache::new();
+        assert_matches_scratch(&mut cache, &strips);
+
+        strips[0].flipped = true;
+        assert_matches_scratch(&mut cache, &strips);
+
+        // Flip and move in the same frame
+        strips[0].flipped = false;
+        strips[0].x = 0.5;
+        assert_matches_scratch(&mut cache, &strips);
+    }
+
+    #[test]
+    fn test_resize_strip() {
+        let mut strips = vec![create_test_strip(1, 0.1, 0.4, true, 30)];
+        let mut cache = LayoutCache::new();
+        assert_matches_scratch(&mut cache, &strips);
+
+        strips[0].pixel_count = 80;
+        assert_matches_scratch(&mut cache, &strips);
+
+        strips[0].spacing = 0.004;
+        assert_matches_scratch(&mut cache, &strips);
+
+        strips[0].pixel_count = 0;
+        assert_matches_scratch(&mut cache, &strips);
+
+        strips[0].pixel_count = 5;
+        strips[0].x = 0.9;
+        assert_matches_scratch(&mut cache, &strips);
+    }
+
+    #[test]
+    fn test_reorder_strips() {
+        let mut strips = vec![
+            create_test_strip(1, 0.0, 0.2, false, 40),
+            create_test_strip(2, 0.3, 0.5, true, 25),
+            create_test_strip(3, 0.6, 0.8, false, 60),
+        ];
+        let mut cache = LayoutCache::new();
+        assert_matches_scratch(&mut cache, &strips);
+
+        // Same strips in a different order: each index now holds another strip
+        strips.swap(0, 2);
+        assert_matches_scratch(&mut cache, &strips);
+
+        strips.rotate_left(1);
+        assert_matches_scratch(&mut cache, &strips);
+
+        // Removal and insertion shift the strips after them
+        strips.remove(0);
+        assert_matches_scratch(&mut cache, &strips);
+
+        strips.insert(0, create_test_strip(4, 0.2, 0.65, true, 10));
+        assert_matches_scratch(&mut cache, &strips);
+
+        strips.clear();
+        assert_matches_scratch(&mut cache, &strips);
+    }
+}
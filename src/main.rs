@@ -4,13 +4,18 @@ mod model;
 mod engine;
 mod audio;
 mod scanner;
+mod geometry;
+mod blend;
+mod transmit;
 mod midi;
 mod db;
+mod persist;
 
 use eframe::egui;
-use model::{AppState, PixelStrip, Mask};
+use model::{AppState, PixelStrip, Mask, exact_rgb};
 use engine::LightingEngine;
 use db::Database;
+use persist::SaveWorker;
 use std::fs;
 use std::process::Command;
 use std::path::{Path, PathBuf};
@@ -123,6 +128,8 @@ struct MyApp {
     main_scenes_midi_filter: MidiFilter,
     // Database
     db: Database,
+    // Writes snapshots off the UI thread through its own connection
+    saver: SaveWorker,
     last_change_time: Option<Instant>,
     save_debounce: Duration,
     // Import/Export UI state
@@ -205,6 +212,11 @@ impl Default for MyApp {
             }
         }
         
+        // Saves go through a second connection owned by the save thread
+        let saver = Database::open(&db_path)
+            .map(SaveWorker::spawn)
+            .unwrap_or_else(|e| panic!("Fatal: Cannot open database for saving at {:?}: {}", db_path, e));
+
         // Init MIDI
         let (tx_event, rx_event) = std::sync::mpsc::channel();
         let tx_cmd = midi::start_midi_service(tx_event);
@@ -239,6 +251,7 @@ impl Default for MyApp {
             main_scenes_category_filter: None,
             main_scenes_midi_filter: MidiFilter::All,
             db,
+            saver,
             last_change_time: None,
             save_debounce: Duration::from_secs(5),
             import_dialog_open: false,
@@ -255,15 +268,22 @@ impl Default for MyApp {
 
 impl MyApp {
     fn save_state(&mut self) {
-        match self.db.save_state(&self.state) {
-            Ok(_) => {
+        // Written on the save thread; the outcome is picked up in poll_save_result
+        self.saver.save(self.state.clone());
+        self.status = "Saving...".into();
+        self.last_change_time = None; // Reset debounce timer
+    }
+
+    fn poll_save_result(&mut self) {
+        match self.saver.poll_result() {
+            Some(Ok(())) => {
                 self.status = "Saved to database".into();
-                self.last_change_time = None; // Reset debounce timer
             }
-            Err(e) => {
+            Some(Err(e)) => {
                 self.status = format!("Save failed: {}", e);
                 eprintln!("Database save error: {}", e);
             }
+            None => {}
         }
     }
 
@@ -278,6 +298,8 @@ impl MyApp {
             .add_filter("JSON", &["json"])
             .save_file()
         {
+            // Export what's been saved so far, including any save still in flight
+            self.saver.flush();
             match self.db.export_to_json() {
                 Ok(json) => {
                     match fs::write(&path, json) {
@@ -313,6 +335,8 @@ impl MyApp {
         if let Some(path) = &self.import_file_path {
             match fs::read_to_string(path) {
                 Ok(json) => {
+                    // A save still in flight would otherwise land on top of the import
+                    self.saver.flush();
                     match self.db.import_from_json(&json, self.import_merge_mode) {
                         Ok(_) => {
                             // Reload state from database
@@ -1418,14 +1442,14 @@ impl eframe::App for MyApp {
                                                 // ... (Reusing existing UI logic, but refactored to check `ge`)
                                                 // INLINED FOR NOW:
                                                 if ge.kind == "Solid" {
-                                                    let mut color = ge.params.get("color").and_then(|v| serde_json::from_value(v.clone()).ok()).unwrap_or([255u8,255,255]);
+                                                    let mut color = ge.params.get("color").and_then(exact_rgb).unwrap_or([255u8,255,255]);
                                                     if color_picker(ui, &mut color, format!("ge_sol_{}_{}", scene.id, eff_idx)) {
                                                         ge.params.insert("color".into(), serde_json::json!([color[0], color[1], color[2]]));
                                                     }
                                                 } else if ge.kind == "Flash" {
                                                     ui.horizontal(|ui| {
                                                         ui.label("Color:");
-                                                         let mut color = ge.params.get("color").and_then(|v| serde_json::from_value(v.clone()).ok()).unwrap_or([255u8,255,255]);
+                                                         let mut color = ge.params.get("color").and_then(exact_rgb).unwrap_or([255u8,255,255]);
                                                         if color_picker(ui, &mut color, format!("ge_fl_{}_{}", scene.id, eff_idx)) {
                                                             ge.params.insert("color".into(), serde_json::json!([color[0], color[1], color[2]]));
                                                         }
@@ -1453,7 +1477,7 @@ impl eframe::App for MyApp {
                                                 } else if ge.kind == "Sparkle" {
                                                     ui.horizontal(|ui| {
                                                         ui.label("Color:");
-                                                        let mut color = ge.params.get("color").and_then(|v| serde_json::from_value(v.clone()).ok()).unwrap_or([255u8,255,255]);
+                                                        let mut color = ge.params.get("color").and_then(exact_rgb).unwrap_or([255u8,255,255]);
                                                         if color_picker(ui, &mut color, format!("ge_spk_{}_{}", scene.id, eff_idx)) {
                                                             ge.params.insert("color".into(), serde_json::json!([color[0], color[1], color[2]]));
                                                         }
@@ -1473,14 +1497,14 @@ impl eframe::App for MyApp {
                                                 } else if ge.kind == "ColorWash" {
                                                     ui.horizontal(|ui| {
                                                         ui.label("Color A:");
-                                                        let mut color_a = ge.params.get("color_a").and_then(|v| serde_json::from_value(v.clone()).ok()).unwrap_or([255u8,0,0]);
+                                                        let mut color_a = ge.params.get("color_a").and_then(exact_rgb).unwrap_or([255u8,0,0]);
                                                         if color_picker(ui, &mut color_a, format!("ge_cw_a_{}_{}", scene.id, eff_idx)) {
                                                             ge.params.insert("color_a".into(), serde_json::json!([color_a[0], color_a[1], color_a[2]]));
                                                         }
                                                     });
                                                     ui.horizontal(|ui| {
                                                         ui.label("Color B:");
-                                                        let mut color_b = ge.params.get("color_b").and_then(|v| serde_json::from_value(v.clone()).ok()).unwrap_or([0u8,0,255]);
+                                                        let mut color_b = ge.params.get("color_b").and_then(exact_rgb).unwrap_or([0u8,0,255]);
                                                         if color_picker(ui, &mut color_b, format!("ge_cw_b_{}_{}", scene.id, eff_idx)) {
                                                             ge.params.insert("color_b".into(), serde_json::json!([color_b[0], color_b[1], color_b[2]]));
                                                         }
@@ -1514,14 +1538,14 @@ impl eframe::App for MyApp {
                                                 } else if ge.kind == "GlitchSparkle" {
                                                     ui.horizontal(|ui| {
                                                         ui.label("Background:");
-                                                        let mut bg_color = ge.params.get("background_color").and_then(|v| serde_json::from_value(v.clone()).ok()).unwrap_or([0u8,0,0]);
+                                                        let mut bg_color = ge.params.get("background_color").and_then(exact_rgb).unwrap_or([0u8,0,0]);
                                                         if color_picker(ui, &mut bg_color, format!("ge_gs_bg_{}_{}", scene.id, eff_idx)) {
                                                             ge.params.insert("background_color".into(), serde_json::json!([bg_color[0], bg_color[1], bg_color[2]]));
                                                         }
                                                     });
                                                     ui.horizontal(|ui| {
                                                         ui.label("Sparkle:");
-                                                        let mut spk_color = ge.params.get("sparkle_color").and_then(|v| serde_json::from_value(v.clone()).ok()).unwrap_or([255u8,255,255]);
+                                                        let mut spk_color = ge.params.get("sparkle_color").and_then(exact_rgb).unwrap_or([255u8,255,255]);
                                                         if color_picker(ui, &mut spk_color, format!("ge_gs_spk_{}_{}", scene.id, eff_idx)) {
                                                             ge.params.insert("sparkle_color".into(), serde_json::json!([spk_color[0], spk_color[1], spk_color[2]]));
                                                         }
@@ -1541,7 +1565,7 @@ impl eframe::App for MyApp {
                                                 } else if ge.kind == "PulseWave" {
                                                     ui.horizontal(|ui| {
                                                         ui.label("Color:");
-                                                        let mut color = ge.params.get("color").and_then(|v| serde_json::from_value(v.clone()).ok()).unwrap_or([255u8,255,255]);
+                                                        let mut color = ge.params.get("color").and_then(exact_rgb).unwrap_or([255u8,255,255]);
                                                         if color_picker(ui, &mut color, format!("ge_pw_{}_{}", scene.id, eff_idx)) {
                                                             ge.params.insert("color".into(), serde_json::json!([color[0], color[1], color[2]]));
                                                         }
@@ -1595,14 +1619,14 @@ impl eframe::App for MyApp {
                                                 } else if ge.kind == "ZoneAlternate" {
                                                     ui.horizontal(|ui| {
                                                         ui.label("Group A:");
-                                                        let mut color_a = ge.params.get("group_a_color").and_then(|v| serde_json::from_value(v.clone()).ok()).unwrap_or([255u8,0,0]);
+                                                        let mut color_a = ge.params.get("group_a_color").and_then(exact_rgb).unwrap_or([255u8,0,0]);
                                                         if color_picker(ui, &mut color_a, format!("ge_za_a_{}_{}", scene.id, eff_idx)) {
                                                             ge.params.insert("group_a_color".into(), serde_json::json!([color_a[0], color_a[1], color_a[2]]));
                                                         }
                                                     });
                                                     ui.horizontal(|ui| {
                                                         ui.label("Group B:");
-                                                        let mut color_b = ge.params.get("group_b_color").and_then(|v| serde_json::from_value(v.clone()).ok()).unwrap_or([0u8,0,255]);
+                                                        let mut color_b = ge.params.get("group_b_color").and_then(exact_rgb).unwrap_or([0u8,0,255]);
                                                         if color_picker(ui, &mut color_b, format!("ge_za_b_{}_{}", scene.id, eff_idx)) {
                                                             ge.params.insert("group_b_color".into(), serde_json::json!([color_b[0], color_b[1], color_b[2]]));
                                                         }
@@ -1824,10 +1848,7 @@ impl eframe::App for MyApp {
                                     // Color
                                     ui.horizontal(|ui| {
                                         ui.label("Color:");
-                                        let mut rgb = m.params.get("color").and_then(|v| {
-                                            serde_json::from_value::<Vec<u8>>(serde_json::json!(v)).ok()
-                                        }).unwrap_or(vec![255, 0, 0]);
-                                        let mut rgb_arr = [rgb[0], rgb[1], rgb[2]];
+                                        let mut rgb_arr = m.params.get("color").and_then(exact_rgb).unwrap_or([255, 0, 0]);
                                         if color_picker(ui, &mut rgb_arr, format!("msk_main_{}", m.id)) {
                                             m.params.insert("color".into(), serde_json::json!(rgb_arr));
                                             needs_save = true;
@@ -1860,11 +1881,11 @@ impl eframe::App for MyApp {
                                         
                                         // Load colors or init defaults
                                         let mut colors: Vec<[u8; 3]> = m.params.get("gradient_colors").and_then(|v| {
-                                            serde_json::from_value(v.clone()).ok()
+                                            v.as_array()?.iter().map(exact_rgb).collect()
                                         }).unwrap_or_else(|| {
                                             // Fallback to [color, color2] if exists, else defaults
-                                            let c1 = m.params.get("color").and_then(|v| serde_json::from_value(v.clone()).ok()).unwrap_or([0, 255, 255]);
-                                            let c2 = m.params.get("color2").and_then(|v| serde_json::from_value(v.clone()).ok()).unwrap_or([255, 0, 255]);
+                                            let c1 = m.params.get("color").and_then(exact_rgb).unwrap_or([0, 255, 255]);
+                                            let c2 = m.params.get("color2").and_then(exact_rgb).unwrap_or([255, 0, 255]);
                                             vec![c1, c2]
                                         });
 
@@ -3167,6 +3188,11 @@ impl eframe::App for MyApp {
                     }
                     
                     // Draw pixels based on simulation data...
+                    // All of a strip's pixels go into one mesh so they're tessellated
+                    // and submitted as a single shape rather than one rect each.
+                    let mut pixel_mesh = egui::Mesh::default();
+                    pixel_mesh.reserve_vertices(s.pixel_count * 4);
+                    pixel_mesh.reserve_triangles(s.pixel_count * 2);
                     for i in 0..s.pixel_count {
                         // Calculate world pos of pixel i
                         // Calculate world pos of pixel i
@@ -3190,22 +3216,20 @@ impl eframe::App for MyApp {
                             egui::Color32::GRAY
                         };
                         
-                        painter.rect_filled(
-                            egui::Rect::from_center_size(px_screen, egui::vec2(4.0, 4.0)),
-                            1.0, 
+                        // Snap to the pixel grid so the square's edges stay crisp without feathering
+                        pixel_mesh.add_colored_rect(
+                            egui::Rect::from_center_size(painter.round_pos_to_pixels(px_screen), egui::vec2(4.0, 4.0)),
                             color
                         );
                     }
+                    painter.add(egui::Shape::mesh(pixel_mesh));
                 }
                 
                 // Masks
                 for m in &active_masks {
                     let pos = to_screen(m.x, m.y, &self.view);
                     
-                    let mut rgb = m.params.get("color").and_then(|v| {
-                        serde_json::from_value::<Vec<u8>>(serde_json::json!(v)).ok() // Hacky conversion
-                    }).unwrap_or(vec![255, 0, 0]);
-                    if rgb.len() < 3 { rgb = vec![255, 0, 0]; }
+                    let rgb = m.params.get("color").and_then(exact_rgb).unwrap_or([255, 0, 0]);
                     
                     let mode = m.params.get("color_mode").and_then(|v| v.as_str()).unwrap_or("static");
                     
@@ -3246,7 +3270,7 @@ impl eframe::App for MyApp {
                              ];
                              
                              painter.add(egui::Shape::convex_polygon(
-                                 corners.clone(),
+                                 corners,
                                  color,
                                  egui::Stroke::new(2.0, base_color)
                              ));
@@ -3299,11 +3323,11 @@ impl eframe::App for MyApp {
                              let bar_color = if mode == "gradient" {
                                   // Visualize Multi-Color Gradient
                                   let colors: Vec<[u8; 3]> = m.params.get("gradient_colors").and_then(|v| {
-                                      serde_json::from_value(v.clone()).ok()
+                                      v.as_array()?.iter().map(exact_rgb).collect()
                                   }).unwrap_or_else(|| {
                                       // Fallback
-                                      let c1 = m.params.get("color").and_then(|v| serde_json::from_value(v.clone()).ok()).unwrap_or([255, 255, 255]);
-                                      let c2 = m.params.get("color2").and_then(|v| serde_json::from_value(v.clone()).ok()).unwrap_or([0, 0, 0]);
+                                      let c1 = m.params.get("color").and_then(exact_rgb).unwrap_or([255, 255, 255]);
+                                      let c2 = m.params.get("color2").and_then(exact_rgb).unwrap_or([0, 0, 0]);
                                       vec![c1, c2]
                                   });
                                   
@@ -3343,7 +3367,7 @@ impl eframe::App for MyApp {
                                       egui::Color32::from_rgb(r, g, b)
                                   }
                              } else {
-                                   let c: [u8; 3] = m.params.get("color").and_then(|v| serde_json::from_value(v.clone()).ok()).unwrap_or([255, 255, 255]);
+                                   let c: [u8; 3] = m.params.get("color").and_then(exact_rgb).unwrap_or([255, 255, 255]);
                                    egui::Color32::from_rgb(c[0], c[1], c[2])
                              };
 
@@ -3413,7 +3437,7 @@ impl eframe::App for MyApp {
                              ];
 
                              painter.add(egui::Shape::convex_polygon(
-                                 corners.clone(),
+                                 corners,
                                  color,
                                  egui::Stroke::new(2.0, base_color)
                              ));
@@ -3510,13 +3534,15 @@ impl eframe::App for MyApp {
                 self.save_state();
             }
         }
+        self.poll_save_result();
 
         ctx.request_repaint();
     }
 
     fn on_exit(&mut self, _gl: Option<&eframe::glow::Context>) {
-        // Save state when app is closing
+        // Save state when app is closing, and wait for it to reach the database
         self.save_state();
+        self.saver.flush();
     }
 }
 // Simple RGB color picker helper with Hex Input
@@ -81,6 +81,19 @@ impl Default for PixelStrip {
     }
 }
 
+/// Parse a JSON value as exactly three in-range color components, without
+/// cloning it through `serde_json::from_value`.
+pub fn exact_rgb(v: &serde_json::Value) -> Option<[u8; 3]> {
+    match v.as_array()?.as_slice() {
+        [r, g, b] => Some([
+            u8::try_from(r.as_u64()?).ok()?,
+            u8::try_from(g.as_u64()?).ok()?,
+            u8::try_from(b.as_u64()?).ok()?,
+        ]),
+        _ => None,
+    }
+}
+
 #[derive(Serialize, Deserialize, Clone, Debug)]
 pub struct Mask {
     pub id: u64,
@@ -90,7 +103,7 @@ pub struct Mask {
     pub params: HashMap<String, serde_json::Value>,
 }
 
-#[derive(Serialize, Deserialize, Clone, Debug)]
+#[derive(Serialize, Deserialize, Clone, Debug, PartialEq)]
 pub struct NetworkConfig {
     pub use_multicast: bool,
     pub unicast_ip: String,
@@ -0,0 +1,141 @@
+//! # Background Saving
+//!
+//! Writing the full configuration to SQLite rewrites every table inside one
+//! transaction, which can take long enough to drop UI frames (and with them
+//! sACN output, since the engine renders on the UI thread). Saves are therefore
+//! handed to a worker thread that owns its own database connection.
+//!
+//! ## Coalescing
+//!
+//! Every save writes a complete snapshot, so only the newest one matters. When
+//! several snapshots queue up behind a slow write, the worker skips straight
+//! to the latest.
+//!
+//! ## Unchanged Snapshots
+//!
+//! Saves are triggered by UI interactions that often leave the configuration as
+//! it was (re-selecting a scene, a drag that ends where it started). The worker
+//! keeps the serialized form of the last snapshot it wrote and skips the
+//! transaction when a new one serializes identically; encoding to JSON costs far
+//! less than rewriting every table. That record is dropped on [`SaveWorker::flush`],
+//! which precedes any access through another connection.
+
+use crate::db::Database;
+use crate::model::AppState;
+use anyhow::Result;
+use std::sync::mpsc::{self, Receiver, Sender};
+use std::thread::JoinHandle;
+
+enum SaveRequest {
+    /// Write this snapshot
+    Save(AppState),
+    /// Signal once everything queued before it has been written
+    Flush(Sender<()>),
+}
+
+/// Handle to the save worker thread.
+///
+/// Dropping the handle writes any pending snapshot and joins the thread.
+pub struct SaveWorker {
+    requests: Option<Sender<SaveRequest>>,
+    results: Receiver<Result<()>>,
+    thread: Option<JoinHandle<()>>,
+}
+
+impl SaveWorker {
+    /// Move `db` onto a new save thread.
+    pub fn spawn(db: Database) -> Self {
+        let (request_tx, request_rx) = mpsc::channel::<SaveRequest>();
+        let (result_tx, result_rx) = mpsc::channel::<Result<()>>();
+
+        let thread = std::thread::Builder::new()
+            .name("db-save".to_string())
+            .spawn(move || run_save_loop(db, request_rx, result_tx))
+            .expect("Failed to spawn database save thread");
+
+        Self {
+            requests: Some(request_tx),
+            results: result_rx,
+            thread: Some(thread),
+        }
+    }
+
+    /// Queue a snapshot to be written. Returns immediately.
+    pub fn save(&self, state: AppState) {
+        if let Some(requests) = &self.requests {
+            if requests.send(SaveRequest::Save(state)).is_err() {
+                eprintln!("Database save thread has stopped; changes are not being saved");
+            }
+        }
+    }
+
+    /// Block until every snapshot queued so far has been written.
+    ///
+    /// Needed before reading back through another connection, so the read
+    /// doesn't see (or later get overwritten by) an older snapshot. The next
+    /// save after a flush is always written, since the other connection may
+    /// have changed the database in between.
+    pub fn flush(&self) {
+        let Some(requests) = &self.requests else { return };
+        let (done_tx, done_rx) = mpsc::channel();
+        if requests.send(SaveRequest::Flush(done_tx)).is_ok() {
+            let _ = done_rx.recv();
+        }
+    }
+
+    /// Outcome of the most recent write that finished since the last call.
+    pub fn poll_result(&self) -> Option<Result<()>> {
+        self.results.try_iter().last()
+    }
+}
+
+impl Drop for SaveWorker {
+    fn drop(&mut self) {
+        // Closing the channel ends the thread's receive loop once the queue is written
+        self.requests = None;
+        if let Some(thread) = self.thread.take() {
+            if thread.join().is_err() {
+                eprintln!("Database save thread panicked");
+            }
+        }
+    }
+}
+
+fn run_save_loop(mut db: Database, requests: Receiver<SaveRequest>, results: Sender<Result<()>>) {
+    // Serialized form of the last snapshot written successfully
+    let mut last_written: Option<String> = None;
+
+    while let Ok(first) = requests.recv() {
+        // Take everything that queued up behind the first request, keeping only
+        // the newest snapshot
+        let mut latest = None;
+        let mut flushes = Vec::new();
+        for request in std::iter::once(first).chain(requests.try_iter()) {
+            match request {
+                SaveRequest::Save(state) => latest = Some(state),
+                SaveRequest::Flush(done) => flushes.push(done),
+            }
+        }
+
+        if let Some(state) = latest {
+            let fingerprint = serde_json::to_string(&state).ok();
+            let result = if fingerprint.is_some() && fingerprint == last_written {
+                // Already on disk
+                Ok(())
+            } else {
+                let result = db.save_state(&state);
+                // After a failed write the database no longer matches anything known
+                last_written = if result.is_ok() { fingerprint } else { None };
+                result
+            };
+            // The UI may already be gone during shutdown
+            let _ = results.send(result);
+        }
+        if !flushes.is_empty() {
+            last_written = None;
+        }
+        for done in flushes {
+            let _ = done.send(());
+        }
+    }
+}
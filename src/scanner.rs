@@ -27,6 +27,213 @@
 //! ```
 
 use crate::model::PixelStrip;
+use crate::geometry::StripGeometry;
+use crate::blend::add_scaled;
+
+/// Small epsilon for floating point tolerance at edges
+/// This prevents pixels right at the boundary from being excluded
+/// due to floating point rounding errors in the rotation transform
+const EPSILON: f32 = 0.0001;
+
+/// A scanner mask with all of its frame-invariant values resolved.
+///
+/// Building one of these does the trigonometry and bar placement once per
+/// mask per frame; [`ScannerMask::apply_to_strip`] is then the per-pixel
+/// kernel that the engine runs for every strip.
+pub struct ScannerMask {
+    mask_x: f32,
+    mask_y: f32,
+    cos_theta: f32,
+    sin_theta: f32,
+    /// Half extents with the edge tolerance already added
+    limit_x: f32,
+    limit_y: f32,
+    bar_center_x: f32,
+    bar_width: f32,
+    /// `1 / bar_width`, so the soft-edge falloff multiplies instead of divides
+    inv_bar_width: f32,
+    hard_edge: bool,
+    color: [u8; 3],
+    /// World-space bounding boxes `[x0, x1, y0, y1]` of the whole mask and of the bar
+    mask_bounds: [f32; 4],
+    bar_bounds: [f32; 4],
+}
+
+impl ScannerMask {
+    /// Resolve a scanner mask for the current frame.
+    ///
+    /// Parameters are the same as [`apply_scanner_mask`].
+    pub fn new(
+        mask_x: f32,
+        mask_y: f32,
+        mask_width: f32,
+        mask_height: f32,
+        mask_rotation_degrees: f32,
+        bar_position_normalized: f32,
+        bar_width: f32,
+        hard_edge: bool,
+        color: [u8; 3],
+    ) -> Self {
+        // Precompute rotation matrix values for inverse rotation
+        // We rotate by -θ to convert from world space to local space
+        let rotation_rad = mask_rotation_degrees.to_radians();
+
+        // Calculate bar center position in mask local space
+        // bar_position_normalized ranges from -1.0 to 1.0
+        // We scale by (width/2 - bar_width) so the bar EDGES reach the mask edges,
+        // not the bar CENTER. This prevents the bar from being clipped at edges.
+        let sweep_range = (mask_width / 2.0) - bar_width;
+
+        let cos_theta = rotation_rad.cos();
+        let sin_theta = rotation_rad.sin();
+        let half_width = mask_width / 2.0;
+        let half_height = mask_height / 2.0;
+        let bar_center_x = sweep_range * bar_position_normalized;
+
+        // Axis-aligned bounds of a rotated rectangle with the given local center
+        // offset along X and half extents, used to skip strips that can't be hit
+        let world_bounds = |center_x: f32, half_x: f32, half_y: f32| -> [f32; 4] {
+            let cx = mask_x + center_x * cos_theta;
+            let cy = mask_y + center_x * sin_theta;
+            let ext_x = cos_theta.abs() * half_x + sin_theta.abs() * half_y;
+            let ext_y = sin_theta.abs() * half_x + cos_theta.abs() * half_y;
+            [cx - ext_x, cx + ext_x, cy - ext_y, cy + ext_y]
+        };
+
+        Self {
+            mask_x,
+            mask_y,
+            cos_theta,
+            sin_theta,
+            limit_x: half_width + EPSILON,
+            limit_y: half_height + EPSILON,
+            bar_center_x,
+            bar_width,
+            inv_bar_width: 1.0 / bar_width,
+            hard_edge,
+            color,
+            mask_bounds: world_bounds(0.0, half_width, half_height),
+            bar_bounds: world_bounds(bar_center_x, bar_width, half_height),
+        }
+    }
+
+    /// Per-strip part of the world → local transform.
+    ///
+    /// Every pixel on a strip shares the same Y, so the `dy` terms of the
+    /// inverse rotation are constant along the strip. Returns
+    /// `(dy * sin(θ), dy * cos(θ))` to be reused for each pixel.
+    #[inline]
+    fn row_terms(&self, pixel_world_y: f32) -> (f32, f32) {
+        let dy = pixel_world_y - self.mask_y;
+        (dy * self.sin_theta, dy * self.cos_theta)
+    }
+
+    // Rotate by -θ (inverse rotation) to align with mask's local axes
+    // Using inverse rotation matrix:
+    // [local_x]   [ cos(θ)  sin(θ)] [dx]
+    // [local_y] = [-sin(θ)  cos(θ)] [dy]
+    //
+    // `dx` is the pixel's X offset from the mask center and `row` comes from
+    // [`ScannerMask::row_terms`] for the pixel's strip. The two local axes are
+    // computed separately so callers can reject on X before paying for Y.
+
+    /// Local X coordinate of a pixel.
+    #[inline]
+    fn local_x(&self, dx: f32, row: (f32, f32)) -> f32 {
+        dx * self.cos_theta + row.0
+    }
+
+    /// Must satisfy: -half_width <= local_x <= half_width (with tolerance)
+    #[inline]
+    fn inside_x(&self, local_x: f32) -> bool {
+        !(local_x < -self.limit_x || local_x > self.limit_x)
+    }
+
+    /// Must satisfy: -half_height <= local_y <= half_height (with tolerance)
+    #[inline]
+    fn inside_y(&self, dx: f32, row: (f32, f32)) -> bool {
+        let local_y = -dx * self.sin_theta + row.1;
+        !(local_y < -self.limit_y || local_y > self.limit_y)
+    }
+
+    /// World-space bounds `[x0, x1, y0, y1]` of the whole mask rectangle.
+    pub fn mask_bounds(&self) -> [f32; 4] {
+        self.mask_bounds
+    }
+
+    /// World-space bounds `[x0, x1, y0, y1]` of the scanning bar.
+    pub fn bar_bounds(&self) -> [f32; 4] {
+        self.bar_bounds
+    }
+
+    /// Additively blend the scanning bar into one strip.
+    ///
+    /// `geometry` holds the strip's cached world-space pixel positions.
+    pub fn apply_to_strip(&self, strip: &mut PixelStrip, geometry: &StripGeometry) {
+        // Skip strips that lie entirely outside the bar
+        let [x0, x1, y0, y1] = self.bar_bounds;
+        if !geometry.overlaps_box(x0, x1, y0, y1) {
+            return;
+        }
+        self.apply_pixels(strip, geometry);
+    }
+
+    /// Accumulate the bar onto every pixel of the strip, without the bounds reject.
+    pub fn apply_pixels(&self, strip: &mut PixelStrip, geometry: &StripGeometry) {
+        // Ensure we don't exceed array bounds; zipping with the cached positions
+        // also stops at the shorter of the two, without per-pixel index checks
+        let pixel_limit = strip.pixel_count.min(strip.data.len());
+        let row = self.row_terms(geometry.y);
+
+        for (pixel, &pixel_world_x) in strip.data[..pixel_limit].iter_mut().zip(&geometry.xs) {
+            // Translate: move origin to mask center
+            let dx = pixel_world_x - self.mask_x;
+            let local_x = self.local_x(dx, row);
+
+            // The bar is a vertical line at x = bar_center_x in local space
+            // Distance is just the horizontal offset
+            let distance_to_bar = (local_x - self.bar_center_x).abs();
+
+            // Most pixels miss the bar, so test that first; the mask bounds
+            // (and the local Y they need) are only checked for bar hits
+            if distance_to_bar <= self.bar_width && self.inside_x(local_x) && self.inside_y(dx, row) {
+                // Calculate intensity based on distance
+                let intensity = if self.hard_edge {
+                    // Hard edge: full intensity anywhere within bar_width
+                    1.0
+                } else {
+                    // Soft edge: linear falloff from 1.0 at center to 0.0 at bar_width
+                    (1.0 - distance_to_bar * self.inv_bar_width).max(0.0)
+                };
+
+                // Add to existing pixel color (saturating to prevent overflow)
+                add_scaled(pixel, self.color, intensity);
+            }
+        }
+    }
+
+    /// Debug visualization: paint every pixel inside the mask rectangle white.
+    pub fn fill_bounds_on_strip(&self, strip: &mut PixelStrip, geometry: &StripGeometry) {
+        let [x0, x1, y0, y1] = self.mask_bounds;
+        if !geometry.overlaps_box(x0, x1, y0, y1) {
+            return;
+        }
+        self.fill_pixels(strip, geometry);
+    }
+
+    /// Fill every pixel of the strip inside the mask, without the bounds reject.
+    pub fn fill_pixels(&self, strip: &mut PixelStrip, geometry: &StripGeometry) {
+        let pixel_limit = strip.pixel_count.min(strip.data.len());
+        let row = self.row_terms(geometry.y);
+
+        for (pixel, &pixel_world_x) in strip.data[..pixel_limit].iter_mut().zip(&geometry.xs) {
+            let dx = pixel_world_x - self.mask_x;
+            if self.inside_x(self.local_x(dx, row)) && self.inside_y(dx, row) {
+                *pixel = [255, 255, 255];
+            }
+        }
+    }
+}
 
 /// Apply a scanner mask effect to LED strips.
 ///
@@ -80,105 +287,22 @@ pub fn apply_scanner_mask(
     color: [u8; 3],
     strips: &mut [PixelStrip],
 ) {
-    // Precompute rotation matrix values for inverse rotation
-    // We rotate by -θ to convert from world space to local space
-    let rotation_rad = mask_rotation_degrees.to_radians();
-    let cos_theta = rotation_rad.cos();
-    let sin_theta = rotation_rad.sin();
-
-    // Calculate bar center position in mask local space
-    // bar_position_normalized ranges from -1.0 to 1.0
-    // We scale by (width/2 - bar_width) so the bar EDGES reach the mask edges,
-    // not the bar CENTER. This prevents the bar from being clipped at edges.
-    let sweep_range = (mask_width / 2.0) - bar_width;
-    let bar_center_x = sweep_range * bar_position_normalized;
-
-    // Precompute half dimensions for bounds checking
-    let half_width = mask_width / 2.0;
-    let half_height = mask_height / 2.0;
+    let mask = ScannerMask::new(
+        mask_x,
+        mask_y,
+        mask_width,
+        mask_height,
+        mask_rotation_degrees,
+        bar_position_normalized,
+        bar_width,
+        hard_edge,
+        color,
+    );
 
     // Process each LED strip
     for strip in strips.iter_mut() {
-        // Ensure we don't exceed array bounds
-        let pixel_limit = strip.pixel_count.min(strip.data.len());
-
-        // Process each pixel in the strip
-        for pixel_index in 0..pixel_limit {
-            // === 1. Calculate pixel position in world space ===
-
-            // Apply direction
-            let pixel_world_x = if strip.flipped {
-                 // Flipped: Start at x + length, go left... 
-                 // OR: x + ((count-1-i) * spacing)
-                 // This effectively maps Index 0 -> Far Right, Index N -> Left (Strip X)
-                 strip.x + ((strip.pixel_count - 1).saturating_sub(pixel_index) as f32 * strip.spacing)
-            } else {
-                strip.x + (pixel_index as f32 * strip.spacing)
-            };
-            let pixel_world_y = strip.y;
-
-            // === 2. Transform to mask's local coordinate system ===
-
-            // Translate: move origin to mask center
-            let dx = pixel_world_x - mask_x;
-            let dy = pixel_world_y - mask_y;
-
-            // Rotate by -θ (inverse rotation) to align with mask's local axes
-            // Using inverse rotation matrix:
-            // [local_x]   [ cos(θ)  sin(θ)] [dx]
-            // [local_y] = [-sin(θ)  cos(θ)] [dy]
-            let local_x = dx * cos_theta + dy * sin_theta;
-            let local_y = -dx * sin_theta + dy * cos_theta;
-
-            // === 3. Check if pixel is inside rectangular mask bounds ===
-
-            // Small epsilon for floating point tolerance at edges
-            // This prevents pixels right at the boundary from being excluded
-            // due to floating point rounding errors in the rotation transform
-            const EPSILON: f32 = 0.0001;
-
-            // Must satisfy: -half_width <= local_x <= half_width (with tolerance)
-            //          AND: -half_height <= local_y <= half_height (with tolerance)
-            if local_x < -(half_width + EPSILON) || local_x > (half_width + EPSILON) {
-                continue; // Outside horizontal bounds
-            }
-            if local_y < -(half_height + EPSILON) || local_y > (half_height + EPSILON) {
-                continue; // Outside vertical bounds
-            }
-
-            // === 4. Calculate distance to scanning bar ===
-
-            // The bar is a vertical line at x = bar_center_x in local space
-            // Distance is just the horizontal offset
-            let distance_to_bar = (local_x - bar_center_x).abs();
-
-            // === 5. Apply color if within bar width ===
-
-            if distance_to_bar <= bar_width {
-                // Calculate intensity based on distance
-                let intensity = if hard_edge {
-                    // Hard edge: full intensity anywhere within bar_width
-                    1.0
-                } else {
-                    // Soft edge: linear falloff from 1.0 at center to 0.0 at bar_width
-                    // intensity = 1.0 - (distance / bar_width)
-                    (1.0 - distance_to_bar / bar_width).max(0.0)
-                };
-
-                // Apply intensity to color
-                let r = (color[0] as f32 * intensity) as u8;
-                let g = (color[1] as f32 * intensity) as u8;
-                let b = (color[2] as f32 * intensity) as u8;
-
-                // Add to existing pixel color (saturating to prevent overflow)
-                let current = strip.data[pixel_index];
-                strip.data[pixel_index] = [
-                    current[0].saturating_add(r),
-                    current[1].saturating_add(g),
-                    current[2].saturating_add(b),
-                ];
-            }
-        }
+        let geometry = StripGeometry::from_strip(strip);
+        mask.apply_to_strip(strip, &geometry);
     }
 }
 
@@ -0,0 +1,541 @@
+//! # sACN Output Thread
+//!
+//! Network sends are kept off the render path. The engine patches each frame
+//! into a [`DmxFrame`] and hands it to a dedicated thread that owns the
+//! `SacnSource`, so socket syscalls never stall the UI thread that renders.
+//!
+//! ## Double Buffering
+//!
+//! Frame buffers circulate between the two sides: once the output thread has
+//! sent a frame it hands the buffer back, and the engine refills it for a later
+//! frame. Steady state therefore allocates nothing.
+//!
+//! Frames are handed over through a single-slot mailbox rather than a queue. If
+//! the output thread hasn't sent the previous frame yet, the new one replaces it
+//! and the older buffer goes back to the engine, so submitting never blocks and
+//! output never lags behind the render.
+//!
+//! ## Pacing
+//!
+//! Submitting a frame wakes the output thread, which sends it straight away so
+//! beat-synced output isn't held back. Sends are capped at one per
+//! `FRAME_INTERVAL`: a frame submitted sooner waits out the remainder, and if
+//! another arrives meanwhile only the newest is sent.
+//!
+//! Unchanged frames aren't re-sent on every render. Instead the thread re-sends
+//! the last frame itself every `KEEPALIVE_INTERVAL`, so the stream stays alive
+//! even when the UI stops rendering.
+
+use sacn::source::SacnSource;
+use std::collections::HashSet;
+use std::net::SocketAddr;
+use std::sync::mpsc::{self, Receiver, Sender};
+use std::sync::{Arc, Condvar, Mutex, MutexGuard, PoisonError};
+use std::thread::JoinHandle;
+use std::time::{Duration, Instant};
+use log::{info, debug, warn, error};
+
+/// Bytes per universe in a [`DmxFrame`]: the start code plus 512 channels.
+pub const UNIVERSE_LEN: usize = 513;
+
+/// One frame of DMX output.
+#[derive(Default)]
+pub struct DmxFrame {
+    /// Universes to send, sorted and deduplicated
+    pub universes: Vec<u16>,
+    /// Packet payloads for `universes`, back to back in the same order:
+    /// `UNIVERSE_LEN` bytes each, ready to send as-is
+    pub data: Vec<u8>,
+    /// Unicast destination, or `None` for multicast
+    pub dst_ip: Option<SocketAddr>,
+}
+
+/// Single-slot mailbox between the engine and the output thread.
+///
+/// Holds at most one frame; a newer frame replaces an unsent one, so the
+/// engine never waits and the thread always sends the newest render.
+#[derive(Default)]
+struct Mailbox {
+    latest: Option<DmxFrame>,
+    closed: bool,
+}
+
+#[derive(Default)]
+struct Shared {
+    mailbox: Mutex<Mailbox>,
+    /// Signalled when a frame is submitted or the mailbox closes
+    wake: Condvar,
+}
+
+impl Shared {
+    fn lock(&self) -> MutexGuard<'_, Mailbox> {
+        // The lock is only held to swap a frame in or out, so a panic elsewhere
+        // can't leave the mailbox half-updated
+        self.mailbox.lock().unwrap_or_else(PoisonError::into_inner)
+    }
+}
+
+/// Handle to the sACN output thread.
+///
+/// Dropping the handle closes the mailbox and joins the thread.
+pub struct SacnOutput {
+    shared: Arc<Shared>,
+    spare: Receiver<DmxFrame>,
+    /// A frame replaced in the mailbox before it was sent, reused for the next render
+    held: Option<DmxFrame>,
+    thread: Option<JoinHandle<()>>,
+}
+
+impl SacnOutput {
+    /// Move `sender` onto a new output thread.
+    pub fn spawn(sender: SacnSource) -> Self {
+        let shared = Arc::new(Shared::default());
+        let (spare_tx, spare_rx) = mpsc::channel::<DmxFrame>();
+
+        let thread_shared = Arc::clone(&shared);
+        let thread = std::thread::Builder::new()
+            .name("sacn-output".to_string())
+            .spawn(move || run_output_loop(sender, &thread_shared, spare_tx))
+            .expect("Failed to spawn sACN output thread");
+
+        Self {
+            shared,
+            spare: spare_rx,
+            held: None,
+            thread: Some(thread),
+        }
+    }
+
+    /// A frame buffer to render into.
+    ///
+    /// Prefers a buffer that was already in use so its allocations are reused;
+    /// the contents are stale and must be overwritten by the caller.
+    pub fn take_frame(&mut self) -> DmxFrame {
+        if let Some(frame) = self.held.take() {
+            return frame;
+        }
+        self.spare.try_recv().unwrap_or_default()
+    }
+
+    /// Hand a finished frame to the output thread. Never blocks.
+    ///
+    /// If the thread hasn't sent the previous frame yet, this one replaces it and
+    /// the older buffer is kept back for reuse.
+    pub fn submit(&mut self, frame: DmxFrame) {
+        let stale = self.shared.lock().latest.replace(frame);
+        self.shared.wake.notify_one();
+        if stale.is_some() {
+            self.held = stale;
+        }
+    }
+}
+
+impl Drop for SacnOutput {
+    fn drop(&mut self) {
+        // The thread sends whatever is still in the mailbox, then exits
+        self.shared.lock().closed = true;
+        self.shared.wake.notify_one();
+        if let Some(thread) = self.thread.take() {
+            if thread.join().is_err() {
+                error!("[LIGHTS] sACN output thread panicked");
+            }
+        }
+    }
+}
+
+/// Minimum time between sends: 44 Hz, the fastest a full 512-channel DMX
+/// universe refreshes on the wire.
+const FRAME_INTERVAL: Duration = Duration::from_micros(1_000_000 / 44);
+
+/// Minimum time between send-error warnings.
+///
+/// A lost network or unreachable unicast target makes every frame fail, so
+/// warnings are limited to one per interval; the rest go to the debug log and
+/// are counted in the next warning.
+const SEND_WARNING_INTERVAL: Duration = Duration::from_secs(1);
+
+/// Rate limiter for send-error warnings.
+#[derive(Default)]
+struct SendErrorThrottle {
+    last_warning: Option<Instant>,
+    suppressed: u32,
+}
+
+impl SendErrorThrottle {
+    /// Whether an error at `now` should be logged as a warning. If so, returns
+    /// how many errors were suppressed since the previous warning.
+    fn warn_now(&mut self, now: Instant) -> Option<u32> {
+        if self.last_warning.is_some_and(|t| now.duration_since(t) < SEND_WARNING_INTERVAL) {
+            self.suppressed += 1;
+            return None;
+        }
+        self.last_warning = Some(now);
+        Some(std::mem::take(&mut self.suppressed))
+    }
+}
+
+/// Longest time an unchanged frame goes without being re-sent.
+///
+/// E1.31 receivers treat a universe as lost after 2.5s of silence, and sources
+/// that stop changing are expected to keep refreshing within 800ms to 1s. When
+/// no new frame arrives in time (e.g. the window is minimised and the UI stops
+/// repainting), the output thread re-sends the last one itself.
+const KEEPALIVE_INTERVAL: Duration = Duration::from_millis(800);
+
+/// The last frame put on the wire, for skipping repeats and keepalives.
+#[derive(Default)]
+struct LastSent {
+    frame: DmxFrame,
+    at: Option<Instant>,
+    /// Whether that send succeeded; a failed frame is never skipped as a repeat
+    delivered: bool,
+}
+
+impl LastSent {
+    /// Whether `frame` repeats what was sent recently enough to skip it.
+    fn is_repeat(&self, frame: &DmxFrame, now: Instant) -> bool {
+        self.delivered
+            && self.at.is_some_and(|at| now.duration_since(at) < KEEPALIVE_INTERVAL)
+            && self.frame.dst_ip == frame.dst_ip
+            && self.frame.universes == frame.universes
+            && self.frame.data == frame.data
+    }
+
+    fn record(&mut self, frame: &DmxFrame, now: Instant, delivered: bool) {
+        // clone_from reuses the existing allocations
+        self.frame.universes.clone_from(&frame.universes);
+        self.frame.data.clone_from(&frame.data);
+        self.frame.dst_ip = frame.dst_ip;
+        self.at = Some(now);
+        self.delivered = delivered;
+    }
+
+    /// When the last frame is next due to be re-sent, if anything was sent.
+    fn keepalive_due(&self) -> Option<Instant> {
+        if self.frame.universes.is_empty() {
+            return None;
+        }
+        self.at.map(|at| at + KEEPALIVE_INTERVAL)
+    }
+}
+
+/// Owns the sACN source and everything needed to put a frame on the wire.
+struct Transmitter {
+    sender: SacnSource,
+    registered_universes: HashSet<u16>,
+    send_errors: SendErrorThrottle,
+    last_sent: LastSent,
+}
+
+impl Transmitter {
+    /// Send `frame`, unless it repeats the last one within `KEEPALIVE_INTERVAL`.
+    fn send_frame(&mut self, frame: &DmxFrame, now: Instant) {
+        // Static scenes render the same frame over and over; those repeats are
+        // skipped, and the output loop re-sends the frame as a keepalive instead
+        if frame.universes.is_empty() || self.last_sent.is_repeat(frame, now) {
+            return;
+        }
+        let delivered = self.transmit(frame, now);
+        self.last_sent.record(frame, now, delivered);
+    }
+
+    /// Re-send the last frame so receivers don't time out the stream.
+    fn send_keepalive(&mut self, now: Instant) {
+        let frame = std::mem::take(&mut self.last_sent.frame);
+        let delivered = self.transmit(&frame, now);
+        self.last_sent.frame = frame;
+        self.last_sent.at = Some(now);
+        self.last_sent.delivered = delivered;
+    }
+
+    /// Put `frame` on the wire. Returns whether every universe was sent.
+    fn transmit(&mut self, frame: &DmxFrame, now: Instant) -> bool {
+        let dst_ip = frame.dst_ip;
+
+        // Register any universes seen for the first time
+        for &u in &frame.universes {
+            if !self.registered_universes.contains(&u) {
+                match self.sender.register_universe(u) {
+                    Ok(_) => {
+                        self.registered_universes.insert(u);
+                        info!("[LIGHTS] Registered sACN Universe {}", u);
+                    },
+                    Err(e) => {
+                        error!("[LIGHTS] Failed to register sACN Universe {}: {:?}", u, e);
+                    }
+                }
+            }
+        }
+
+        if frame.universes.iter().all(|u| self.registered_universes.contains(u)) {
+            // The frame buffer already has the layout `send` expects for several
+            // universes (one start code + 512 channels each, in order), so the
+            // whole frame goes out in a single call.
+            if let Err(e) = self.sender.send(&frame.universes, &frame.data, Some(200), dst_ip, None) {
+                match self.send_errors.warn_now(now) {
+                    Some(suppressed) => warn!(
+                        "[LIGHTS] sACN send error on Universes {:?} (Dest: {:?}): {:?} ({} similar errors suppressed)",
+                        frame.universes, dst_ip, e, suppressed
+                    ),
+                    None => debug!("[LIGHTS] sACN send error on Universes {:?} (Dest: {:?}): {:?}", frame.universes, dst_ip, e),
+                }
+                return false;
+            }
+            true
+        } else {
+            // Some universe failed to register; send the others one at a time
+            for (&u, data) in frame.universes.iter().zip(frame.data.chunks_exact(UNIVERSE_LEN)) {
+                if !self.registered_universes.contains(&u) {
+                    continue;
+                }
+                if let Err(e) = self.sender.send(&[u], data, Some(200), dst_ip, None) {
+                    match self.send_errors.warn_now(now) {
+                        Some(suppressed) => warn!(
+                            "[LIGHTS] sACN send error on Universe {} (Dest: {:?}): {:?} ({} similar errors suppressed)",
+                            u, dst_ip, e, suppressed
+                        ),
+                        None => debug!("[LIGHTS] sACN send error on Universe {} (Dest: {:?}): {:?}", u, dst_ip, e),
+                    }
+                }
+            }
+            false
+        }
+    }
+}
+
+fn run_output_loop(sender: SacnSource, shared: &Shared, spare: Sender<DmxFrame>) {
+    let mut transmitter = Transmitter {
+        sender,
+        registered_universes: HashSet::new(),
+        send_errors: SendErrorThrottle::default(),
+        last_sent: LastSent::default(),
+    };
+
+    // Earliest time the next frame may go out
+    let mut next_send = Instant::now();
+
+    loop {
+        // Wait for a frame (or shutdown), then hold it back only as long as the
+        // rate cap requires. With no new frame, wake up to send a keepalive.
+        let (frame, keepalive, closed) = {
+            let mut mailbox = shared.lock();
+            let mut keepalive = false;
+            while !mailbox.closed {
+                let now = Instant::now();
+                let keepalive_due = transmitter.last_sent.keepalive_due();
+                match next_step(mailbox.latest.is_some(), now, next_send, keepalive_due) {
+                    Step::Send => break,
+                    Step::Keepalive => {
+                        keepalive = true;
+                        break;
+                    }
+                    Step::WaitUntil(at) => {
+                        mailbox = shared.wake.wait_timeout(mailbox, at - now)
+                            .unwrap_or_else(PoisonError::into_inner)
+                            .0;
+                    }
+                    Step::Idle => {
+                        mailbox = shared.wake.wait(mailbox)
+                            .unwrap_or_else(PoisonError::into_inner);
+                    }
+                }
+            }
+            (mailbox.latest.take(), keepalive, mailbox.closed)
+        };
+
+        let now = Instant::now();
+        if let Some(frame) = frame {
+            transmitter.send_frame(&frame, now);
+            next_send = now + FRAME_INTERVAL;
+            // Hand the buffer back; if the engine is gone it's simply dropped
+            let _ = spare.send(frame);
+        } else if keepalive {
+            transmitter.send_keepalive(now);
+            next_send = now + FRAME_INTERVAL;
+        }
+        if closed {
+            break;
+        }
+    }
+}
+
+/// What the output thread does next.
+#[derive(Debug, PartialEq)]
+enum Step {
+    /// Send the frame in the mailbox now
+    Send,
+    /// No new frame arrived in time; re-send the last one now
+    Keepalive,
+    /// Sleep until then (or a wake-up): a frame is waiting on the rate cap, or
+    /// a keepalive is due
+    WaitUntil(Instant),
+    /// Nothing to do until a frame is submitted
+    Idle,
+}
+
+/// Decide the output thread's next step at `now`, given whether a frame is
+/// waiting, the earliest time the rate cap allows the next send, and when the
+/// last frame is due to be re-sent (`None` if nothing has been sent).
+fn next_step(has_frame: bool, now: Instant, next_send: Instant, keepalive_due: Option<Instant>) -> Step {
+    if has_frame {
+        if now >= next_send {
+            Step::Send
+        } else {
+            Step::WaitUntil(next_send)
+        }
+    } else {
+        match keepalive_due {
+            Some(due) if now >= due => Step::Keepalive,
+            Some(due) => Step::WaitUntil(due),
+            None => Step::Idle,
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn frame(universes: &[u16], dst_ip: Option<SocketAddr>) -> DmxFrame {
+        let mut data = vec![0u8; universes.len() * UNIVERSE_LEN];
+        for (i, payload) in data.chunks_exact_mut(UNIVERSE_LEN).enumerate() {
+            payload[1] = i as u8 + 1;
+        }
+        DmxFrame { universes: universes.to_vec(), data, dst_ip }
+    }
+
+    #[test]
+    fn test_repeat_within_keepalive() {
+        let start = Instant::now();
+        let sent = frame(&[1, 2], None);
+        let mut last = LastSent::default();
+        assert!(!last.is_repeat(&sent, start), "nothing sent yet");
+
+        last.record(&sent, start, true);
+        assert!(last.is_repeat(&frame(&[1, 2], None), start + Duration::from_millis(100)));
+        assert!(last.is_repeat(&frame(&[1, 2], None), start + KEEPALIVE_INTERVAL - Duration::from_millis(1)));
+        assert!(!last.is_repeat(&frame(&[1, 2], None), start + KEEPALIVE_INTERVAL));
+        assert!(!last.is_repeat(&frame(&[1, 2], None), start + KEEPALIVE_INTERVAL * 2));
+
+        // A frame whose send failed is retried rather than skipped
+        last.record(&sent, start, false);
+        assert!(!last.is_repeat(&frame(&[1, 2], None), start + Duration::from_millis(100)));
+    }
+
+    #[test]
+    fn test_changes_force_send() {
+        let start = Instant::now();
+        let soon = start + Duration::from_millis(10);
+        let mut last = LastSent::default();
+        last.record(&frame(&[1, 2], None), start, true);
+
+        // Different destination
+        let unicast: SocketAddr = "192.168.1.50:5568".parse().unwrap();
+        assert!(!last.is_repeat(&frame(&[1, 2], Some(unicast)), soon));
+
+        // Different universe list, with and without the same payload length
+        assert!(!last.is_repeat(&frame(&[1, 3], None), soon));
+        assert!(!last.is_repeat(&frame(&[1], None), soon));
+
+        // Different channel data
+        let mut changed = frame(&[1, 2], None);
+        changed.data[UNIVERSE_LEN + 7] = 255;
+        assert!(!last.is_repeat(&changed, soon));
+
+        // Recording the new frame makes it the one repeats are checked against
+        last.record(&frame(&[1, 2], Some(unicast)), soon, true);
+        assert!(last.is_repeat(&frame(&[1, 2], Some(unicast)), soon));
+        assert!(!last.is_repeat(&frame(&[1, 2], None), soon));
+    }
+
+    #[test]
+    fn test_warning_throttle() {
+        let start = Instant::now();
+        let mut throttle = SendErrorThrottle::default();
+
+        assert_eq!(throttle.warn_now(start), Some(0));
+        assert_eq!(throttle.warn_now(start + Duration::from_millis(10)), None);
+        assert_eq!(throttle.warn_now(start + Duration::from_millis(500)), None);
+
+        // The next warning reports the suppressed errors, then the count resets
+        let second = start + SEND_WARNING_INTERVAL;
+        assert_eq!(throttle.warn_now(second), Some(2));
+        assert_eq!(throttle.warn_now(second + Duration::from_millis(10)), None);
+        assert_eq!(throttle.warn_now(second + SEND_WARNING_INTERVAL), Some(1));
+        assert_eq!(throttle.warn_now(second + SEND_WARNING_INTERVAL * 3), Some(0));
+    }
+
+    #[test]
+    fn test_frames_send_immediately_up_to_rate_cap() {
+        let start = Instant::now();
+        let keepalive_due = Some(start + KEEPALIVE_INTERVAL);
+
+        // A frame is sent as soon as it arrives once the cap has passed
+        assert_eq!(next_step(true, start, start, keepalive_due), Step::Send);
+        assert_eq!(next_step(true, start + FRAME_INTERVAL * 3, start, keepalive_due), Step::Send);
+
+        // Sooner than that it waits out only the remainder
+        let next_send = start + FRAME_INTERVAL;
+        assert_eq!(next_step(true, start + FRAME_INTERVAL / 2, next_send, keepalive_due), Step::WaitUntil(next_send));
+
+        // Before anything has been sent, an empty mailbox sleeps until woken
+        assert_eq!(next_step(false, start, next_send, None), Step::Idle);
+        assert_eq!(next_step(false, start + KEEPALIVE_INTERVAL * 2, next_send, None), Step::Idle);
+    }
+
+    #[test]
+    fn test_keepalive_without_new_frames() {
+        let start = Instant::now();
+        let mut last = LastSent::default();
+        assert_eq!(last.keepalive_due(), None);
+
+        last.record(&frame(&[1, 2], None), start, true);
+        let due = start + KEEPALIVE_INTERVAL;
+        assert_eq!(last.keepalive_due(), Some(due));
+        let next_send = start + FRAME_INTERVAL;
+
+        // An empty mailbox sleeps until the keepalive is due, then re-sends
+        assert_eq!(next_step(false, start + FRAME_INTERVAL * 2, next_send, last.keepalive_due()), Step::WaitUntil(due));
+        assert_eq!(next_step(false, due, next_send, last.keepalive_due()), Step::Keepalive);
+
+        // A new frame still takes priority over a due keepalive
+        assert_eq!(next_step(true, due, next_send, last.keepalive_due()), Step::Send);
+    }
+
+    #[test]
+    fn test_stalled_ui_keeps_stream_alive() {
+        // Drive the output loop's decisions through 5s with a single frame
+        // submitted at the start, as when the UI stops repainting
+        let start = Instant::now();
+        let mut last = LastSent::default();
+        let mut has_frame = true;
+        let mut next_send = start;
+        let mut now = start;
+        let mut sends = Vec::new();
+
+        while now < start + Duration::from_secs(5) {
+            match next_step(has_frame, now, next_send, last.keepalive_due()) {
+                Step::Send => {
+                    last.record(&frame(&[1], None), now, true);
+                    has_frame = false;
+                    next_send = now + FRAME_INTERVAL;
+                    sends.push(now);
+                }
+                Step::Keepalive => {
+                    last.at = Some(now);
+                    next_send = now + FRAME_INTERVAL;
+                    sends.push(now);
+                }
+                Step::WaitUntil(at) => now = at,
+                Step::Idle => panic!("output went idle after a frame was sent"),
+            }
+        }
+
+        // One send plus a keepalive every interval, never leaving a gap long
+        // enough for receivers to drop the stream
+        assert_eq!(sends.len(), 1 + (5000 / KEEPALIVE_INTERVAL.as_millis()) as usize);
+        for pair in sends.windows(2) {
+            assert_eq!(pair[1] - pair[0], KEEPALIVE_INTERVAL);
+        }
+    }
+}